@@ -1,6 +1,7 @@
 #!/usr/bin/python
 import os
 import binascii
+import hashlib
 import argparse
 import json
 import threading
@@ -102,19 +103,106 @@ class Commands(object):
 
         print config
 
-        signed = self.client.sign_plugin(config=config, protospec=protospec)
+        signed = self.client.sign_plugin(config=config, protospec=protospec, key_id=args.key_id)
         f = open('config_signed.bin', 'w')
         f.write(signed)
         f.close()
 
         return "Signed config stored in config_signed.bin"
 
+    def sign_plugin_batch(self, args):
+        # Manifest is JSON like {"protospec": "config.proto", "key_id": "...",
+        #   "configs": [{"config": "a.json", "output": "a_signed.bin"}, ...]}
+        # Relative paths are relative to the manifest, output defaults to <config>_signed.bin
+        manifest = json.loads(load_file_url(args.manifest))
+        base = os.path.dirname(os.path.abspath(args.manifest))
+
+        def path(p):
+            if p.startswith('http'):
+                return p
+            return os.path.join(base, p)
+
+        protospec = load_file_url(path(manifest['protospec']))
+        configs = []
+        outputs = []
+        for item in manifest['configs']:
+            configs.append(load_file_url(path(item['config'])))
+            outputs.append(path(item.get('output', os.path.splitext(os.path.basename(item['config']))[0] + '_signed.bin')))
+
+        key_id = args.key_id or manifest.get('key_id')
+        if key_id:
+            key_id = str(key_id)
+        signed = self.client.sign_plugin_batch(configs=configs, protospec=protospec, key_id=key_id, merkle=args.merkle)
+        for (output, data) in zip(outputs, signed):
+            f = open(output, 'w')
+            f.write(data)
+            f.close()
+            print "Signed config stored in", output
+
+        return "Signed %d configs" % len(configs)
+
+    def sign_firmware(self, args):
+        fp = open(args.firmware, 'rb')
+        size = os.fstat(fp.fileno()).st_size
+
+        signature = self.client.sign_firmware(fp, size, slot=args.slot, key_id=args.key_id)
+        fp.close()
+
+        f = open(args.firmware + '.sig', 'wb')
+        f.write(signature)
+        f.close()
+
+        return "Signature %s stored in %s.sig" % (binascii.hexlify(signature), args.firmware)
+
+    def sign_digest(self, args):
+        # Only SHA-256 of the file goes over the wire
+        h = hashlib.sha256()
+        fp = open(args.file, 'rb')
+        while True:
+            data = fp.read(65536)
+            if not data:
+                break
+            h.update(data)
+        fp.close()
+
+        description = args.description or os.path.basename(args.file)
+        print "Confirm SHA-256 %s on the device" % h.hexdigest()
+
+        signature = self.client.sign_digest(h.digest(), description, key_id=args.key_id)
+        f = open(args.file + '.sig', 'wb')
+        f.write(signature)
+        f.close()
+
+        return "Signature %s stored in %s.sig" % (binascii.hexlify(signature), args.file)
+
     list.help = 'List connected Trezor USB devices'
     sign_plugin.help = 'Sign plugin config'
+    sign_digest.help = 'Sign file by sending only its SHA-256 digest (signature differs from sign_firmware)'
+    sign_firmware.help = 'Sign firmware image'
+    sign_plugin_batch.help = 'Sign all plugin configs listed in manifest with a single confirmation'
 
     sign_plugin.arguments = (
         (('protospec',), {'type': str}),
         (('config',), {'type': str}),
+        (('-k', '--key-id'), {'dest': 'key_id', 'type': str, 'help': 'Id of the signing key (default key if not set)'}),
+    )
+
+    sign_digest.arguments = (
+        (('file',), {'type': str}),
+        (('-d', '--description'), {'dest': 'description', 'type': str, 'help': 'Text shown on the display (file name by default)'}),
+        (('-k', '--key-id'), {'dest': 'key_id', 'type': str, 'help': 'Id of the signing key (default key if not set)'}),
+    )
+
+    sign_firmware.arguments = (
+        (('firmware',), {'type': str}),
+        (('-s', '--slot'), {'dest': 'slot', 'type': int, 'default': 1, 'help': 'Signature slot'}),
+        (('-k', '--key-id'), {'dest': 'key_id', 'type': str, 'help': 'Id of the signing key (default key if not set)'}),
+    )
+
+    sign_plugin_batch.arguments = (
+        (('manifest',), {'type': str}),
+        (('-k', '--key-id'), {'dest': 'key_id', 'type': str, 'help': 'Id of the signing key (overrides key_id from manifest)'}),
+        (('-m', '--merkle'), {'dest': 'merkle', 'action': 'store_true', 'help': 'Sign only Merkle root, outputs carry inclusion proofs'}),
     )
 
 def list_usb():
@@ -11,7 +11,7 @@ setup(
     long_description = open(join(here, 'README.rst')).read(),
     packages = find_packages(),
     test_suite = 'tests',
-    install_requires = ['ecdsa>=0.9', 'RPi.GPIO', 'spidev', 'pyserial', 'protobuf'],
+    install_requires = ['ecdsa>=0.14', 'RPi.GPIO', 'spidev', 'pyserial', 'protobuf'],
     entry_points = {'console_scripts': ['trezor-signer  =  signer:run', ], },
     include_package_data = True,
     package_data = {'protobuf': ['*.proto'], },
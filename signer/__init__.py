@@ -13,7 +13,6 @@
     @license: GPLv3
 '''
 import argparse
-import time
 
 import signer_pb2 as proto
 from buttons import Buttons
@@ -21,23 +20,39 @@ from layout import Layout
 from display import Display
 from display_buffer import DisplayBuffer
 
+from keyring import Keyring
+import sign_plugin
 from machine import StateMachine
+from reactor import Reactor
+from transport import FrameTooLong
 
 DISPLAY_WIDTH = 128
 DISPLAY_HEIGHT = 64
 
+# Seconds between checks of a pressed button waiting for release
+BUTTON_RELEASE_DELAY = 0.05
+
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Signer optimized for Raspberry Pi (but works on any '
                                                  'Linux machine).')
 
-    parser.add_argument('-k', '--keyfile', dest='keyfile', default='key.pem', help='Private key file (in PEM)')
+    parser.add_argument('-k', '--keyfile', dest='keyfile', action='append',
+                        help='Private key file (in PEM), can be used more times (default: ~/.trezor_key.pem)')
+    parser.add_argument('-b', '--backend', dest='backend', default='auto', choices=['auto', 'openssl', 'ecdsa'],
+                        help="ECDSA implementation; auto uses OpenSSL (cryptography package) when available")
     parser.add_argument('-s', '--shield', dest='shield', action='store_true',
                         help="Use Raspberry Pi shield with OLED display and hardware buttons.")
     parser.add_argument('-t', '--transport', dest='transport', default='cp2110',
                         help="Transport used for talking with the main computer")
     parser.add_argument('-p', '--path', dest='path', default='/dev/ttyAMA0',
                         help="Path used by the transport (usually serial port)")
+    parser.add_argument('-H', '--headless', dest='headless', action='store_true',
+                        help="No virtual display nor pygame buttons (no SDL needed), frames are only recorded")
+    parser.add_argument('-r', '--record', dest='record', default=None,
+                        help="Record every displayed frame to this directory (with frames.log)")
+    parser.add_argument('--record-format', dest='record_format', default='png', choices=['png', 'pbm'],
+                        help="Image format of recorded frames")
     parser.add_argument('-v', '--verbose', dest='verbose', action='store_true',
                         help='Enable low-level debugging messages')
     return parser.parse_args()
@@ -75,63 +90,114 @@ def main(args):
     transport = get_transport(args.transport, args.path)
 
     # Initialize hardware (screen, buttons)
-    but = Buttons(hw=args.shield, stdin=not args.shield, pygame=not args.shield)
+    virtual = not args.shield and not args.headless
+    but = Buttons(hw=args.shield, stdin=not args.shield, pygame=virtual)
     buff = DisplayBuffer(DISPLAY_WIDTH, DISPLAY_HEIGHT)
-    display = Display(buff, spi=args.shield, virtual=not args.shield)
+    display = Display(buff, spi=args.shield, virtual=virtual,
+                      record=args.headless or args.record is not None, record_path=args.record,
+                      record_format=args.record_format)
     display.init()
 
     # Initialize layout driver
     layout = Layout(buff)
 
+    # Choose the fastest available ECDSA implementation
+    sign_plugin.set_backend(args.backend)
+
+    # Load signing keys once, they're reloaded only when key file changes
+    keyring = Keyring(args.keyfile or ['~/.trezor_key.pem'])
+
+    reactor = Reactor()
+    scrolling = [False]  # Is the scroll timer scheduled?
+
+    def handle_job():
+        # Signing job running on worker thread has new progress or responses
+        send(machine.poll_job())
+
     # Startup state machine and switch it to default state
-    machine = StateMachine(args.keyfile, layout)
+    machine = StateMachine(keyring, layout, lambda: reactor.call_soon_threadsafe(handle_job))
 
     display.refresh()
+    layout.need_refresh = False
+
+    def send(resp):
+        if resp is None:
+            return
 
-    # Main cycle
-    while True:
-        # Set True if device does something
-        # False = device will sleep for a moment
-        is_active = False
+        if isinstance(resp, list):
+            # Responses of signing job, batches stream many of them
+            for r in resp:
+                send(r)
+            return
 
+        print "Sending", resp.__class__.__name__, resp
+        transport.write(resp)
+
+    def handle_buttons():
         try:
             # Read button states
             button = but.read()
         except KeyboardInterrupt:
             # User requested to close the app
-            break
+            reactor.stop()
+            return
 
         if button is not None:
             print "Button", button
-            is_active = True
 
-            resp = machine.press_button(button)
-            if resp is not None:
-                print "Sending", resp
-                transport.write(resp)
+            send(machine.press_button(button))
+
+        elif but.pressed is not None:
+            # Press is reported after releasing the button, check it again soon
+            reactor.call_later(BUTTON_RELEASE_DELAY, handle_buttons)
+
+    def handle_transport():
+        # Handle main connection, process all frames received so far
+        while True:
+            try:
+                msg = transport.read()
+            except FrameTooLong as exc:
+                # Nothing of the frame is kept, the rest of the stream is fine
+                print str(exc)
+                machine.set_main_state()
+                send(proto.Failure(code=proto.Failure_SyntaxError, message=str(exc)))
+                continue
+
+            if msg is None:
+                break
 
-        # Handle main connection
-        msg = transport.read()
-        if msg is not None:
             print "Received", msg.__class__.__name__  # , msg
-            resp = machine.process_message(msg)
-            if resp is not None:
-                print "Sending", resp.__class__.__name__, resp
-                transport.write(resp)
-                is_active = True
+            send(machine.process_message(msg))
 
+    def scroll():
         # Display scrolling
-        is_active |= layout.update()
+        if layout.update():
+            reactor.call_later(layout.update_delta, scroll)
+        else:
+            scrolling[0] = False
+
+    def after_iteration():
+        if len(layout.scrolls) and not scrolling[0]:
+            scrolling[0] = True
+            reactor.call_later(layout.update_delta, scroll)
 
         if layout.need_refresh:
             # Update display
             display.refresh()
+            layout.need_refresh = False
+
+    if transport.fileno() is not None:
+        reactor.add_reader(transport, handle_transport)
+    but.register(reactor, handle_buttons)
 
-        if not is_active:
-            # Nothing to do, sleep for a moment
-            time.sleep(0.1)
+    # Main cycle, sleeps until there is something to do
+    try:
+        reactor.run(after_iteration)
+    except KeyboardInterrupt:
+        pass
 
     # Close transports
+    reactor.close()
     transport.close()
 
 def run():
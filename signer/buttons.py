@@ -1,6 +1,15 @@
+import time
+
+# Reported instead of True when 'Yes' was held at least LONG_PRESS seconds
+HOLD = 'hold'
+LONG_PRESS = 1.0
+
+
 class Buttons(object):
     def __init__(self, hw=False, stdin=True, pygame=False):
         self.pressed = None
+        self.pressed_at = 0  # When the press was registered
+        self.pygame_interval = 0.05  # pygame has no descriptor, so it is polled
 
         if hw:
             import buttons_hw
@@ -20,6 +29,23 @@ class Buttons(object):
         else:
             self.pygame = None
 
+    def register(self, reactor, callback):
+        '''Let reactor call callback whenever some button may change its state'''
+        if self.hw:
+            # GPIO edge callbacks run in a separate thread
+            self.hw.watch(lambda: reactor.call_soon_threadsafe(callback))
+
+        if self.stdin:
+            reactor.add_reader(self.stdin, callback)
+
+        if self.pygame:
+            def poll():
+                callback()
+                if self.pygame:
+                    reactor.call_later(self.pygame_interval, poll)
+
+            reactor.call_later(self.pygame_interval, poll)
+
     def read(self):
         but = []
 
@@ -49,9 +75,17 @@ class Buttons(object):
 
         elif True in but and self.pressed is not True:
             self.pressed = True
+            self.pressed_at = time.time()
+            return None
+
+        elif HOLD in but and self.pressed is None:
+            # Hold typed on stdin
+            self.pressed = HOLD
             return None
 
         if self.pressed is not None and but.count(None) == len(but):
             state = self.pressed
             self.pressed = None
+            if state is True and time.time() - self.pressed_at >= LONG_PRESS:
+                return HOLD
             return state
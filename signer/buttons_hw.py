@@ -10,6 +10,11 @@ class HwButtons(object):
         GPIO.setup(self.PIN_BTN_YES, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
         GPIO.setup(self.PIN_BTN_NO, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
 
+    def watch(self, callback):
+        # Call callback on every press and release
+        for pin in (self.PIN_BTN_YES, self.PIN_BTN_NO):
+            GPIO.add_event_detect(pin, GPIO.BOTH, callback=lambda channel: callback())
+
     def read(self):
         no_state = (GPIO.input(self.PIN_BTN_NO) == 1)
         yes_state = (GPIO.input(self.PIN_BTN_YES) == 1)
@@ -1,11 +1,17 @@
 from select import select  # For raw_input timeout
 import sys
 
+import buttons
+
 
 class StdinButtons(object):
     def __init__(self):
         print "Press y+<enter> to confirm an action."
         print "Press n+<enter> to cancel an action."
+        print "Press h+<enter> to hold 'Yes' (next page of plugin config)."
+
+    def fileno(self):
+        return sys.stdin.fileno()
 
     def read(self):
         rlist, _, _ = select([sys.stdin], [], [], 0)
@@ -19,4 +25,7 @@ class StdinButtons(object):
         if key == 'n':
             return False
 
+        if key == 'h':
+            return buttons.HOLD
+
         return None
@@ -1,5 +1,6 @@
 import os
 import time
+import hashlib
 
 import signer_pb2 as proto
 
@@ -48,7 +49,10 @@ class TrezorClient(object):
             resp = self.transport.read_blocking()
         finally:
             self.transport.session_end()
-        
+
+        return self._check_response(resp)
+
+    def _check_response(self, resp):
         if isinstance(resp, proto.Failure):
             self.message_func(resp.message)
 
@@ -62,9 +66,90 @@ class TrezorClient(object):
             
         return resp
 
-    def sign_plugin(self, config, protospec):
-        resp = self.call(proto.SignPluginConfig(config=config, protospec=protospec))
+    def sign_plugin(self, config, protospec, key_id=None):
+        msg = proto.SignPluginConfig(config=config, protospec=protospec)
+        if key_id:
+            msg.key_id = key_id
+
+        digest = hashlib.sha256(config).hexdigest()
+        self.message_func("Confirm config fingerprint FP %s %s on the device" % (digest[:8], digest[8:16]))
+
+        resp = self.call(msg)
         if isinstance(resp, proto.SignedObject):
             return resp.payload
 
         raise Exception("Unexpected result " % resp)
+
+    def sign_digest(self, digest, description, key_id=None):
+        '''Sign SHA-256 digest of data, returns 64-byte signature
+           of sign_plugin.get_host_digest_message(digest)'''
+        msg = proto.SignDigest(digest=digest, description=description)
+        if key_id:
+            msg.key_id = key_id
+
+        resp = self.call(msg)
+        if isinstance(resp, proto.SignedObject):
+            return resp.payload
+
+        raise Exception("Unexpected result %s" % resp)
+
+    def sign_plugin_batch(self, configs, protospec, key_id=None, merkle=False):
+        '''Sign many configs after a single confirmation on the device,
+           yields signed payloads in the order of configs. With merkle
+           device signs only Merkle root, see signer/merkle.py'''
+        msg = proto.SignPluginConfigBatch(configs=configs, protospec=protospec)
+        if key_id:
+            msg.key_id = key_id
+        if merkle:
+            msg.merkle = True
+
+        digest = hashlib.sha256(msg.SerializeToString()).hexdigest()
+        self.message_func("Confirm signing of %d configs, digest %s %s" % (len(configs), digest[:8], digest[8:16]))
+
+        if self.debug:
+            print '----------------------'
+            print "Sending", self._pprint(msg)
+
+        try:
+            self.transport.session_begin()
+            self.transport.write(msg)
+
+            # Device sends one SignedObject per config
+            for i in range(len(configs)):
+                resp = self._check_response(self.transport.read_blocking())
+                if not isinstance(resp, proto.SignedObject) or resp.index != i:
+                    raise Exception("Unexpected result %s" % resp)
+
+                yield resp.payload
+        finally:
+            self.transport.session_end()
+
+    def sign_firmware(self, fp, size, slot, key_id=None):
+        '''Upload firmware from file object fp in chunks requested
+           by the device, returns 64-byte signature of the image'''
+        msg = proto.SignFirmware(slot=slot, size=size)
+        if key_id:
+            msg.key_id = key_id
+
+        h = hashlib.sha256()
+        try:
+            self.transport.session_begin()
+            self.transport.write(msg)
+
+            while True:
+                resp = self._check_response(self.transport.read_blocking())
+                if isinstance(resp, proto.SignedObject):
+                    return resp.payload
+
+                if not isinstance(resp, proto.FirmwareChunkRequest):
+                    raise Exception("Unexpected result %s" % resp)
+
+                fp.seek(resp.offset)
+                data = fp.read(resp.length)
+                h.update(data)
+                self.transport.write(proto.FirmwareChunk(data=data))
+
+                if resp.offset + resp.length == size:
+                    self.message_func("Confirm firmware SHA-256 %s on the device" % h.hexdigest())
+        finally:
+            self.transport.session_end()
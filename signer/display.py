@@ -1,5 +1,7 @@
 class Display(object):
-    def __init__(self, buffer, spi=False, virtual=True):
+    def __init__(self, buffer, spi=False, virtual=True, record=False, record_path=None, record_format='png'):
+        self.buffer = buffer
+
         if spi:
             import display_spi
             self.spi = display_spi.SPIDisplay(buffer)
@@ -12,6 +14,12 @@ class Display(object):
         else:
             self.virtual = None
 
+        if record:
+            import display_recorder
+            self.recorder = display_recorder.FrameRecorder(buffer, record_path, record_format)
+        else:
+            self.recorder = None
+
     def init(self):
         if self.spi:
             try:
@@ -21,9 +29,16 @@ class Display(object):
                 self.spi = None
         if self.virtual:
             self.virtual.init()
+        if self.recorder:
+            self.recorder.init()
 
     def refresh(self):
         if self.spi:
             self.spi.refresh()
         if self.virtual:
             self.virtual.refresh()
+        if self.recorder:
+            self.recorder.refresh()
+
+        # Every display got all the changes
+        self.buffer.set_clean()
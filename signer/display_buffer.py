@@ -1,81 +1,234 @@
+'''Monochrome frame buffer in the SSD1306 page layout.
+
+Byte at x + page * width holds pixels (x, page*8) .. (x, page*8 + 7),
+the lowest bit on the top. Rectangle operations work on whole bytes,
+one masked slice per page touched, instead of single pixels.
+
+Buffer remembers the changed column span of every page since the last
+set_clean(), so displays may send only the changed parts.'''
+
+import binascii
+from collections import OrderedDict
+
+# Converted bitmaps kept (logo, images shown by display.py)
+BITMAP_CACHE_SIZE = 8
+
+# Separate windows cost an extra command phase, about as much as sending this many data bytes
+WINDOW_COST = 32
+
+# Rendered strings kept (status bar labels, lines of the current screen)
+STRING_CACHE_SIZE = 64
+
+# Translation tables of (b << n) & 0xFF and b >> n, they move column pixels down and up by n rows
+SHIFT_LEFT = [bytes(bytearray((b << n) & 0xFF for b in range(256))) for n in range(8)]
+SHIFT_RIGHT = [bytes(bytearray(b >> n for b in range(256))) for n in range(8)]
+
+
 class DisplayBuffer(object):
     def __init__(self, width=128, height=64):
         self.width = width
         self.height = height
+        self.tables = {}  # (operation, mask) -> translation table of bytearray.translate()
+        self.bitmaps = {}  # Row-major bitmap content -> the same image in page layout
+        self.atlases = {}  # Font -> columns of all its glyphs
+        self.strings = OrderedDict()  # (font, text) -> rendered columns, least recently used first
+        self.dirty = [None] * (height / 8)  # (x1, x2) changed in each page, None if page is clean
         self.clear()
 
     def clear(self, x1=None, y1=None, x2=None, y2=None):
         if x1 is None:
-            self.data = [0] * (self.width * self.height / 8)
+            self.data = bytearray(self.width * self.height / 8)
+            self._mark_dirty(0, 0, self.width - 1, self.height / 8 - 1)
         else:
-            x1 = max(0, x1)
-            x2 = min(self.width - 1, x2)
-            y1 = max(1, y1)
-            y2 = min(self.height - 1, y2)
+            # Top line is never cleared by rectangle clear
+            self._fill('clear', max(0, x1), max(1, y1), min(self.width - 1, x2), min(self.height - 1, y2))
+
+    def _mark_dirty(self, x1, page1, x2, page2):
+        for page in range(page1, page2 + 1):
+            span = self.dirty[page]
+            if span is None:
+                self.dirty[page] = (x1, x2)
+            else:
+                self.dirty[page] = (min(span[0], x1), max(span[1], x2))
+
+    def get_dirty(self):
+        '''Return list of (x1, page1, x2, page2) windows covering all changes,
+           neighbouring pages are merged when it's cheaper than two windows'''
+        windows = []
+        for (page, span) in enumerate(self.dirty):
+            if span is None:
+                continue
+
+            if len(windows):
+                (x1, page1, x2, page2) = windows[-1]
+                if page2 == page - 1:
+                    merged = (min(x1, span[0]), max(x2, span[1]))
+                    separate = (x2 - x1 + 1) * (page2 - page1 + 1) + span[1] - span[0] + 1
+                    if (merged[1] - merged[0] + 1) * (page - page1 + 1) <= separate + WINDOW_COST:
+                        windows[-1] = (merged[0], page1, merged[1], page)
+                        continue
+
+            windows.append((span[0], page, span[1], page))
+        return windows
+
+    def set_clean(self):
+        '''All changes are on the displays now'''
+        self.dirty = [None] * (self.height / 8)
+
+    def _get_table(self, operation, mask):
+        key = (operation, mask)
+        table = self.tables.get(key)
+        if table is None:
+            if operation == 'clear':
+                table = bytes(bytearray(b & ~mask for b in range(256)))
+            elif operation == 'set':
+                table = bytes(bytearray(b | mask for b in range(256)))
+            else:
+                table = bytes(bytearray(b ^ mask for b in range(256)))
+            self.tables[key] = table
+        return table
+
+    def _fill(self, operation, x1, y1, x2, y2):
+        '''Apply operation ('clear', 'set' or 'invert') to the rectangle,
+           coordinates have to be inside of the buffer already'''
+        if x1 > x2 or y1 > y2:
+            return
+
+        self._mark_dirty(x1, y1 / 8, x2, y2 / 8)
 
-            for x in range(x1, x2 + 1):
-                for y in range(y1, y2 + 1):
-                    #self.clear_pixel(x, y)
-                    self.data[x + (y / 8) * self.width] &= ~(1 << (y % 8))
+        data = self.data
+        for page in range(y1 / 8, y2 / 8 + 1):
+            top = max(y1, page * 8) % 8
+            bottom = min(y2, page * 8 + 7) % 8
+            mask = (0xFF << top) & (0xFF >> (7 - bottom))
+
+            start = x1 + page * self.width
+            end = x2 + 1 + page * self.width
+            if mask == 0xFF and operation != 'invert':
+                data[start:end] = ('\x00' if operation == 'clear' else '\xff') * (end - start)
+            else:
+                data[start:end] = data[start:end].translate(self._get_table(operation, mask))
+
+    def _transpose_bitmap(self, bitmap):
+        data = bytearray(self.width * self.height / 8)
+        for page in range(self.height / 8):
+            for x in range(self.width):
+                value = 0
+                for bit in range(8):
+                    if bitmap[(x / 8) + (page * 8 + bit) * self.width / 8] & (1 << (7 - x % 8)):
+                        value |= 1 << bit
+                data[x + page * self.width] = value
+        return data
 
     def draw_bitmap(self, bitmap):
-        for x in range(self.width):
-            for y in range(self.height):
-                if bitmap[(x / 8) + y * self.width / 8] & (1 << (7 - x % 8)):
-                    self.data[x + (y / 8) * self.width] |= (1 << (y % 8))
-                else:
-                    self.data[x + (y / 8) * self.width] &= ~(1 << (y % 8))
+        '''Draw full screen row-major bitmap (MSB is the leftmost pixel).
+           Conversion to page layout is done only once per bitmap content'''
+        key = bytes(bytearray(bitmap))
+        data = self.bitmaps.get(key)
+        if data is None:
+            if len(self.bitmaps) >= BITMAP_CACHE_SIZE:
+                self.bitmaps.clear()
+            data = self._transpose_bitmap(bytearray(key))
+            self.bitmaps[key] = data
+        self.data[:] = data
+        self._mark_dirty(0, 0, self.width - 1, self.height / 8 - 1)
 
     def draw_pixel(self, x, y):
         if (x < 0) or (y < 0) or (x >= self.width) or (y >= self.height):
             return
         self.data[x + (y / 8) * self.width] |= (1 << (y % 8))
+        self._mark_dirty(x, y / 8, x, y / 8)
 
     def clear_pixel(self, x, y):
         if (x < 0) or (y < 0) or (x >= self.width) or (y >= self.height):
             return
         self.data[x + (y / 8) * self.width] &= ~(1 << (y % 8))
+        self._mark_dirty(x, y / 8, x, y / 8)
 
     def get_pixel(self, x, y):
         if (x < 0) or (y < 0) or (x >= self.width) or (y >= self.height):
             return None
         return self.data[x + (y / 8) * self.width] & (1 << (y % 8)) > 0
 
+    def _get_atlas(self, font):
+        '''Columns of all glyphs of the font as one string, glyph c
+           starts at (c - font.firstchar) * font.width'''
+        atlas = self.atlases.get(font)
+        if atlas is None:
+            # Only font.height lowest bits of each column belong to the glyph
+            mask = (1 << font.height) - 1
+            atlas = bytes(bytearray(column & mask for column in font.table))
+            self.atlases[font] = atlas
+        return atlas
+
+    def _get_glyph(self, c, font):
+        if (c >= font.firstchar) and (c <= font.lastchar):
+            start = (c - font.firstchar) * font.width
+            return self._get_atlas(font)[start:start + font.width]
+
+        # Unknown characters are drawn as a full block
+        return chr((1 << font.height) - 1) * font.width
+
+    def render_string(self, text, font):
+        '''Columns of the whole text including one empty column after each glyph'''
+        key = (font, text)
+        columns = self.strings.pop(key, None)
+        if columns is None:
+            columns = ''.join(self._get_glyph(ord(c), font) + '\x00' for c in text)
+            if len(self.strings) >= STRING_CACHE_SIZE:
+                self.strings.popitem(last=False)
+        self.strings[key] = columns
+        return columns
+
+    def draw_columns(self, x, y, columns):
+        '''OR one byte high columns into the buffer, left top pixel at (x, y)'''
+        first = max(0, -x)
+        last = min(len(columns), self.width - x)
+        if first >= last:
+            return
+
+        columns = columns[first:last]
+        page = y / 8
+        shift = y % 8
+        if shift:
+            # Glyphs span two pages
+            self._or_page(page, x + first, columns.translate(SHIFT_LEFT[shift]))
+            self._or_page(page + 1, x + first, columns.translate(SHIFT_RIGHT[8 - shift]))
+        else:
+            self._or_page(page, x + first, columns)
+
+    def _or_page(self, page, x, columns):
+        if page < 0 or page >= self.height / 8:
+            return
+        self._mark_dirty(x, page, x + len(columns) - 1, page)
+
+        start = x + page * self.width
+        end = start + len(columns)
+        # Bytewise OR done at once on long integers, much faster than a loop over bytes
+        value = int(binascii.hexlify(self.data[start:end]), 16) | int(binascii.hexlify(columns), 16)
+        self.data[start:end] = binascii.unhexlify('%0*x' % (2 * len(columns), value))
+
     def draw_char(self, x, y, c, font):
         if (x >= self.width) or (y >= self.height):
             return
-        column = [0] * font.width
-        if (c >= font.firstchar) and (c <= font.lastchar):
-            for col in range(font.width):
-                column[col] = font.table[((c - font.firstchar) * font.width) + col]
-        else:
-            for col in range(font.width):
-                column[col] = 0xFF
-        for xoffset in range(font.width):
-            for yoffset in range(font.height):
-                if column[xoffset] & (1 << yoffset):
-                    self.draw_pixel(x + xoffset, y + yoffset)
+        self.draw_columns(x, y, self._get_glyph(c, font))
 
     def draw_string(self, x, y, text, font):
-        for i in range(len(text)):
-            self.draw_char(x + (i * (font.width + 1)), y, ord(text[i]), font)
+        if (x >= self.width) or (y >= self.height):
+            return
+        self.draw_columns(x, y, self.render_string(text, font))
 
     def invert(self, x1, y1, x2, y2):
         if (x1 >= self.width) or (y1 >= self.height) or (x2 >= self.width) or (y2 >= self.height):
             return
-        for x in range(x1, x2 + 1):
-            for y in range(y1, y2 + 1):
-                self.data[x + (y / 8) * self.width] ^= (1 << (y % 8))
+        self._fill('invert', max(0, x1), max(0, y1), x2, y2)
 
     def box(self, x1, y1, x2, y2):
-        for x in range(x1, x2 + 1):
-            for y in range(y1, y2 + 1):
-                self.draw_pixel(x, y)
+        self._fill('set', max(0, x1), max(0, y1), min(self.width - 1, x2), min(self.height - 1, y2))
 
     def frame(self, x1, y1, x2, y2):
-        for x in range(x1, x2 + 1):
-            self.draw_pixel(x, y1)
-            self.draw_pixel(x, y2)
-        for y in range(y1 + 1, y2):
-            self.draw_pixel(x1, y)
-            self.draw_pixel(x2, y)
+        # Lines are one pixel wide boxes
+        self.box(x1, y1, x2, y1)
+        self.box(x1, y2, x2, y2)
+        self.box(x1, y1 + 1, x1, y2 - 1)
+        self.box(x2, y1 + 1, x2, y2 - 1)
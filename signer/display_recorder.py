@@ -0,0 +1,109 @@
+'''Display recording rendered frames, it needs neither hardware nor SDL.
+
+Frames are rendered in memory to PBM or PNG images. Refresh with the same
+content as the previous frame records nothing. With a path, every frame
+is also written to frameNNNNNN.<format> and listed in frames.log:
+
+  index  time (unix)  seconds since previous frame  SHA-1 of buffer  file
+
+so CI and load tests can run the whole UI on a headless machine.'''
+
+import os
+import time
+import zlib
+import struct
+import hashlib
+import binascii
+from collections import deque
+
+# Translation of page bytes to '1' (pixel is lit) and '0' for every bit (row) of the page
+ROW_BITS = [''.join('1' if b & (1 << bit) else '0' for b in range(256)) for bit in range(8)]
+
+# Translation of bytes to inverted bytes
+INVERT = ''.join(chr(b ^ 0xFF) for b in range(256))
+
+
+class FrameRecorder(object):
+    def __init__(self, buffer, path=None, image_format='png', keep=16):
+        if image_format not in ('png', 'pbm'):
+            raise Exception("Unknown image format %s" % image_format)
+
+        self.buffer = buffer
+        self.path = os.path.expanduser(path) if path else None
+        self.image_format = image_format
+
+        self.frames = deque(maxlen=keep)  # (index, time, digest, image) of the last recorded frames
+        self.last_frame = None  # Content of the buffer recorded last time
+        self.frameno = 0
+        self.refreshes = 0
+        self.duplicates = 0  # Refreshes with no change
+        self.render_time = 0.0  # Seconds spent by rendering images
+        self.log = None
+
+    def init(self):
+        if not self.path:
+            return
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        self.log = open(os.path.join(self.path, 'frames.log'), 'a')
+
+    def _get_rows(self):
+        '''Rows of the frame, MSB of the first byte is the leftmost pixel'''
+        width = self.buffer.width
+        data = str(self.buffer.data)
+
+        rows = []
+        for y in range(self.buffer.height):
+            page = y / 8
+            bits = data[page * width:(page + 1) * width].translate(ROW_BITS[y % 8])
+            rows.append(binascii.unhexlify('%0*x' % (width / 4, int(bits, 2))))
+        return rows
+
+    def get_pbm(self):
+        # Black is 1 in PBM
+        pixels = ''.join(self._get_rows()).translate(INVERT)
+        return 'P4\n%d %d\n' % (self.buffer.width, self.buffer.height) + pixels
+
+    def get_png(self):
+        def chunk(tag, data):
+            return struct.pack('>L', len(data)) + tag + data + struct.pack('>L', zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+        # 1 bit grayscale, every row starts with filter type 0 (none)
+        header = struct.pack('>LLBBBBB', self.buffer.width, self.buffer.height, 1, 0, 0, 0, 0)
+        pixels = zlib.compress(''.join('\x00' + row for row in self._get_rows()))
+        return '\x89PNG\r\n\x1a\n' + chunk('IHDR', header) + chunk('IDAT', pixels) + chunk('IEND', '')
+
+    def get_image(self):
+        if self.image_format == 'png':
+            return self.get_png()
+        return self.get_pbm()
+
+    def refresh(self):
+        self.refreshes += 1
+
+        frame = bytes(self.buffer.data)
+        if frame == self.last_frame:
+            self.duplicates += 1
+            return
+        self.last_frame = frame
+
+        start = time.time()
+        image = self.get_image()
+        self.render_time += time.time() - start
+
+        digest = hashlib.sha1(frame).hexdigest()
+        if len(self.frames):
+            delta = start - self.frames[-1][1]
+        else:
+            delta = 0.0
+        self.frames.append((self.frameno, start, digest, image))
+
+        if self.log:
+            filename = 'frame%06d.%s' % (self.frameno, self.image_format)
+            with open(os.path.join(self.path, filename), 'wb') as f:
+                f.write(image)
+            self.log.write('%d %.6f %.6f %s %s\n' % (self.frameno, start, delta, digest, filename))
+            self.log.flush()
+
+        self.frameno += 1
@@ -2,6 +2,14 @@ import time
 import spidev
 import RPi.GPIO as GPIO
 
+# Default buffer size of spidev kernel driver, longest possible transfer
+SPI_CHUNK_SIZE = 4096
+
+# Byte with reversed bit order, display is rotated by 180 degrees
+REVERSE_BITS = bytes(bytearray(((x & 0x01) << 7 | (x & 0x02) << 5 | (x & 0x04) << 3 | (x & 0x08) << 1 |
+                                (x & 0x10) >> 1 | (x & 0x20) >> 3 | (x & 0x40) >> 5 | (x & 0x80) >> 7)
+                               for x in range(256)))
+
 
 class SPIDisplay(object):
     def __init__(self, buffer):
@@ -10,6 +18,7 @@ class SPIDisplay(object):
         self.PIN_OLED_RST = 24  # RES
         self.buffer = buffer
         self.spidev = None
+        self.full = True  # Content of display RAM is unknown, next refresh sends everything
 
     def init(self):
         GPIO.setmode(GPIO.BCM)
@@ -34,13 +43,20 @@ class SPIDisplay(object):
         self.__writePin(self.PIN_OLED_CS, 0)  # select
         seq = [0xAE, 0xD5, 0x80, 0xA8, 0x3F, 0xD3, 0x00, 0x40, 0x8D, 0x14, 0x20, 0x00, 0xA1, 0xC8, 0xDA, 0x12, 0x81,
                0xCF, 0xD9, 0xF1, 0xDB, 0x40, 0xA4, 0xA6, 0xAF]
-        self.__sendSPI(seq)
+        self.__sendSPI(bytearray(seq))
         self.__writePin(self.PIN_OLED_CS, 1)  # deselect
 
+        self.full = True
         self.refresh()
 
     def __sendSPI(self, data):
-        self.spidev.xfer2(data[:])
+        if hasattr(self.spidev, 'writebytes2'):
+            # Takes any buffer and splits it to chunks itself (spidev >= 3.4)
+            self.spidev.writebytes2(data)
+            return
+
+        for i in range(0, len(data), SPI_CHUNK_SIZE):
+            self.spidev.xfer2(list(bytearray(data[i:i + SPI_CHUNK_SIZE])))
 
     def __writePin(self, pin, value):
         if value:
@@ -48,16 +64,38 @@ class SPIDisplay(object):
         else:
             GPIO.output(pin, GPIO.LOW)
 
+    def _encode(self, x1, page1, x2, page2):
+        '''Window of the buffer in the order of display RAM'''
+        data = self.buffer.data
+        width = self.buffer.width
+        if x1 == 0 and x2 == width - 1:
+            region = data[page1 * width:(page2 + 1) * width]
+        else:
+            region = bytearray().join(data[page * width + x1:page * width + x2 + 1]
+                                      for page in range(page1, page2 + 1))
+
+        # Rotation by 180 degrees is reversed order of bytes and of bits in every byte
+        return region[::-1].translate(REVERSE_BITS)
+
     def refresh(self):
+        width = self.buffer.width
+        pages = self.buffer.height / 8
+        if self.full:
+            windows = [(0, 0, width - 1, pages - 1)]
+            self.full = False
+        else:
+            windows = self.buffer.get_dirty()
+
+        if not len(windows):
+            return
+
+        # Display stays selected for all command and data phases
         self.__writePin(self.PIN_OLED_CS, 0)  # select
-        seq = [0x00, 0x10, 0x40]
-        self.__sendSPI(seq)
-        self.__writePin(self.PIN_OLED_CS, 1)  # deselect
-        self.__writePin(self.PIN_OLED_DC, 1)  # data
-        self.__writePin(self.PIN_OLED_CS, 0)  # select
-        # rotate display data
-        data = [((x & 0x01) << 7 | (x & 0x02) << 5 | (x & 0x04) << 3 | (x & 0x08) << 1 | (x & 0x10) >> 1 |
-                 (x & 0x20) >> 3 | (x & 0x40) >> 5 | (x & 0x80) >> 7) for x in self.buffer.data[::-1]]
-        self.__sendSPI(data)
+        for (x1, page1, x2, page2) in windows:
+            # Set column and page address window (in horizontal addressing mode) to the rotated window
+            seq = [0x21, width - 1 - x2, width - 1 - x1, 0x22, pages - 1 - page2, pages - 1 - page1]
+            self.__sendSPI(bytearray(seq))
+            self.__writePin(self.PIN_OLED_DC, 1)  # data
+            self.__sendSPI(self._encode(x1, page1, x2, page2))
+            self.__writePin(self.PIN_OLED_DC, 0)  # cmd
         self.__writePin(self.PIN_OLED_CS, 1)  # deselect
-        self.__writePin(self.PIN_OLED_DC, 0)  # cmd
@@ -2,6 +2,13 @@
 import os
 import pygame
 
+try:
+    # pygame.surfarray needs NumPy
+    import numpy
+    import pygame.surfarray
+except ImportError:
+    numpy = None
+
 
 class VirtualDisplay(object):
     def __init__(self, buffer):
@@ -14,6 +21,7 @@ class VirtualDisplay(object):
         self.screen = None
         self.surface = None
         self.frameno = 0
+        self.last_frame = None  # Content of the buffer shown on the screen
 
     def _select_driver(self):
         for driver in self.drivers:
@@ -38,7 +46,19 @@ class VirtualDisplay(object):
 
         self.surface = pygame.Surface((self.buffer.width, self.buffer.height))
 
-    def refresh(self):
+    def _draw_numpy(self, frame):
+        width = self.buffer.width
+        height = self.buffer.height
+
+        # Page layout [page, x] -> bits [page, x, 8] (MSB first) -> pixels [x, y]
+        pages = numpy.frombuffer(frame, dtype=numpy.uint8).reshape(height / 8, width)
+        bits = numpy.unpackbits(pages[:, :, numpy.newaxis], axis=2)[:, :, ::-1]
+        pixels = bits.transpose(1, 0, 2).reshape(width, height)
+
+        white = self.surface.map_rgb(self.white)
+        pygame.surfarray.blit_array(self.surface, pixels.astype(numpy.uint32) * white)
+
+    def _draw_pixels(self):
         self.surface.fill(self.black)
 
         set_at = self.surface.set_at
@@ -55,6 +75,18 @@ class VirtualDisplay(object):
                 if pix:
                     set_at((x, y), white)
 
+    def refresh(self):
+        frame = bytes(self.buffer.data)
+        if frame == self.last_frame:
+            # Screen shows this frame already
+            return
+        self.last_frame = frame
+
+        if numpy is not None:
+            self._draw_numpy(frame)
+        else:
+            self._draw_pixels()
+
         pygame.transform.scale(self.surface, self.screen.get_size(), self.screen)
         pygame.display.flip()
 
@@ -0,0 +1,143 @@
+'''Signing job running on a worker thread.
+
+Compiling, composing and ECDSA take long on Raspberry Pi, so the confirmed
+action doesn't run inside the main loop. Job function gets the job as its
+first argument, reports its progress by job.report(), streams responses
+by job.send() and returns the final response (or None).
+
+Worker thread never touches the display nor the transport. It stores
+the progress and responses and wakes the main loop up (by the thread-safe
+wakeup callback), which collects them by Job.poll().
+
+Future runs speculative work (compiling, composing) while the operator
+reads the confirmation screen, the job then only waits for its result.
+Cancelling the action cancels its future too.'''
+
+import threading
+import traceback
+
+import signer_pb2 as proto
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Job(object):
+    def __init__(self, func, args, wakeup=None):
+        self.func = func
+        self.args = args
+        self.wakeup = wakeup
+
+        self.lock = threading.Lock()
+        self.responses = []  # Produced, but not yet collected by poll()
+        self.progress = (0, 1)
+        self.done = False
+        self.cancelled = False
+        self.notified = False  # Main loop is already woken up, not polled yet
+
+    def start(self):
+        if self.wakeup is None:
+            # Nobody would collect the results from other thread
+            self._run()
+            return
+
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+
+    def cancel(self):
+        # Worker stops at its next report()/send(), everything it produces is dropped
+        self.cancelled = True
+
+    def report(self, current, maximum):
+        if self.cancelled:
+            raise Cancelled()
+
+        with self.lock:
+            self.progress = (current, maximum)
+        self._notify()
+
+    def send(self, msg):
+        if self.cancelled:
+            raise Cancelled()
+
+        with self.lock:
+            self.responses.append(msg)
+        self._notify()
+
+    def poll(self):
+        '''Return (responses, (current, maximum), done) produced since the last poll'''
+        with self.lock:
+            responses = self.responses
+            self.responses = []
+            self.notified = False
+            return (responses, self.progress, self.done)
+
+    def _notify(self):
+        if self.wakeup is None or self.cancelled:
+            return
+
+        # Fast job may report many times before main loop gets to it
+        with self.lock:
+            if self.notified:
+                return
+            self.notified = True
+        self.wakeup()
+
+    def _run(self):
+        try:
+            ret = self.func(self, *self.args)
+        except Cancelled:
+            return
+        except Exception as exc:
+            traceback.print_exc()
+            ret = proto.Failure(message=str(exc))
+
+        with self.lock:
+            if ret is not None:
+                self.responses.append(ret)
+            self.done = True
+        self._notify()
+
+
+class Future(object):
+    '''Result of func(future, *args) computed on a background thread.
+
+       Cancelled future only sets a flag, func calls check() between its
+       steps to stop early. Step already running (compiling a protospec,
+       composing one config) can't be interrupted, it finishes and its
+       result is dropped.'''
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+        self.finished = threading.Event()
+        self.cancelled = False
+        self.value = None
+        self.error = None
+
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled()
+
+    def result(self):
+        '''Wait for the result, exception of func is raised here'''
+        self.finished.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def _run(self):
+        try:
+            self.value = self.func(self, *self.args)
+        except Exception as exc:
+            self.error = exc
+        self.finished.set()
@@ -1,5 +1,6 @@
 import smallfonts
 import time
+import binascii
 
 from logo import logo as default_logo
 
@@ -11,9 +12,11 @@ class Layout(object):
         self.buffer = buffer
         self.update_delta = 0.05
         self.last_screen = None
+        self.screen = 0  # Increased by every new screen
         self.clear()
 
     def clear(self):
+        self.screen += 1
         self.last_update = time.time()
         self.scrolls = []
 
@@ -36,41 +39,45 @@ class Layout(object):
             return False  # Nothing to do
 
         for item in self.scrolls:
-            (direction, wait, pos_x, y, text, font) = item
-
-            width = len(text) * (font.width + 1)
+            (direction, wait, pos_x, y, strip, font) = item
 
             if wait:
+                # Line stays where it is, nothing to draw
                 item[1] -= 1
+                continue
 
-            elif width >= self.buffer.width:
-
-                if pos_x < -width + self.buffer.width + 1 and direction == -1:
-                    item[0] = 1  # Change direction
-                    item[1] = 20  # Set wait cycles
+            width = len(strip)
 
-                if pos_x >= 0 and direction == 1:
-                    item[0] = -1  # Change direction
-                    item[1] = 20  # Set wait cycles
+            if pos_x < -width + self.buffer.width + 1 and direction == -1:
+                item[0] = 1  # Change direction
+                item[1] = 20  # Set wait cycles
 
-                pos_x += direction
-                item[2] = pos_x
+            if pos_x >= 0 and direction == 1:
+                item[0] = -1  # Change direction
+                item[1] = 20  # Set wait cycles
 
-                self.need_refresh = True
+            pos_x += direction
+            item[2] = pos_x
 
-            self._draw_scroll_text(pos_x, y, text, font)
+            self._draw_scroll_text(pos_x, y, strip, font)
+            self.need_refresh = True
 
         return True
 
-    def _draw_scroll_text(self, x, y, text, font):
+    def _draw_scroll_text(self, x, y, strip, font):
+        # Window of the pre-rendered line is copied to the buffer
         self.buffer.clear(0, y, self.buffer.width - 1, y + font.height)
-        self.buffer.draw_string(x, y, text, font)
+        self.buffer.draw_columns(x, y, strip)
 
     def _scroll_text(self, y, text, font):
-        # direction, x pos delta, pos_y, text, font
-        details = [-1, 30, 0, y, text, font]
-        self._draw_scroll_text(0, y, text, font)
-        self.scrolls.append(details)
+        # Line is rendered only once, scrolling just moves it
+        strip = self.buffer.render_string(text, font)
+        self._draw_scroll_text(0, y, strip, font)
+
+        if len(strip) >= self.buffer.width:
+            # direction, wait cycles, pos_x, pos_y, strip, font
+            details = [-1, 30, 0, y, strip, font]
+            self.scrolls.append(details)
 
     def show_logo(self, logo=None, label=None):
         self.clear()
@@ -109,7 +116,8 @@ class Layout(object):
         self.clear()
         font = smallfonts.Font5x8
 
-        for i in range(len(messages)):
+        # Lines below the display would be drawn for nothing
+        for i in range(min(len(messages), self.buffer.height / font.height)):
             msg = messages[i]
             self.buffer.draw_string(0, i * font.height + 1, msg, font)
 
@@ -138,6 +146,12 @@ class Layout(object):
         self.last_screen = 'show_pin_request'
     '''
 
+    def format_digest(self, digest):
+        '''Fingerprint of binary digest as lines of show_question() message,
+           two groups of 8 hex characters per line (SHA-256 takes 4 lines)'''
+        h = binascii.hexlify(digest)
+        return [ h[i:i + 8] + ' ' + h[i + 8:i + 16] for i in range(0, len(h), 16) ]
+
     def show_pin_backoff_progress(self, current, maximum):
         # TODO: Specific text or icon
         self.show_progress(current, maximum, True, default_logo)
@@ -1,14 +1,24 @@
 import time
 import random
 import base64
+import binascii
 import hashlib
 import math
 import os
 import traceback
 
+import json
+
 import signer_pb2 as proto
 
 import sign_plugin
+from job import Job, Future
+from buttons import HOLD
+from transport import FIRMWARE_CHUNK_SIZE
+
+# Text area of the confirmation screen
+LINE_LENGTH = 21
+PAGE_LINES = 5
 
 class PinState(object):
     def __init__(self, layout, storage):
@@ -80,6 +90,32 @@ class PinState(object):
         self.args = []
         self.matrix = None
 
+class ConfigPages(object):
+    '''Plugin config for confirmation, summary first and then the config
+       itself (browsing it is optional). Only the page on the display is
+       ever split into lines.'''
+    def __init__(self, config):
+        self.config = config
+        self.count = 1 + int(math.ceil(len(config) / float(LINE_LENGTH * PAGE_LINES)))
+
+    def _summary(self):
+        # Config already passed sign_plugin.check_config()
+        h = hashlib.sha256(self.config).hexdigest()
+        cfg = json.loads(self.config)
+        return ["Sign config? %d B" % len(self.config),
+                "Whitelist: %d URLs" % len(cfg['whitelist_urls']),
+                "Blacklist: %d URLs" % len(cfg['blacklist_urls']),
+                "Devices: %d" % len(cfg['known_devices']),
+                "FP %s %s" % (h[:8], h[8:16])]
+
+    def get(self, page):
+        if page == 0:
+            return self._summary()
+
+        start = (page - 1) * LINE_LENGTH * PAGE_LINES
+        return [ self.config[start + i * LINE_LENGTH:start + (i + 1) * LINE_LENGTH] for i in range(PAGE_LINES) ]
+
+
 class YesNoState(object):
     def __init__(self, layout):
         self.layout = layout
@@ -102,23 +138,63 @@ class YesNoState(object):
         self.decision = None
         self.func = None
         self.args = []
+        self.pages = None
+        self.page = 0
+        self.screen = None  # Layout screen showing the question
+
+    def is_shown(self):
+        # Anything drawn over the question (upload progress, logo) voids it
+        return self.screen is not None and self.screen == self.layout.screen
 
     def request(self, message, question, yes_text, no_text, func, *args):
         self.layout.show_question(message, question, yes_text, no_text)
+        self.screen = self.layout.screen
+
+        self.func = func
+        self.args = args
+
+        self.allow()
+
+    def request_pages(self, pages, func, *args):
+        # Every page confirms and cancels like any question,
+        # holding 'Yes' turns to the next page (the last one returns to the summary)
+        self.pages = pages
+        self.page = 0
+        self._show_page()
 
         self.func = func
         self.args = args
 
         self.allow()
 
+    def _show_page(self):
+        status = "%d/%d, hold } next" % (self.page + 1, self.pages.count)
+        self.layout.show_question(self.pages.get(self.page), status, 'Confirm }', '{ Cancel')
+        self.screen = self.layout.screen
+
+    def _turn_page(self):
+        # Return True if the decision only moved to another page
+        if self.decision != HOLD:
+            return False
+
+        if self.pages is None:
+            # Nothing to browse, holding is just 'Yes'
+            self.decision = True
+            return False
+
+        self.page = (self.page + 1) % self.pages.count
+        self.decision = None
+        self._show_page()
+        return True
+
     def store(self, button):
-        if not self.func:
+        if not self.func or not self.is_shown():
             return
 
         self.decision = button
 
     def resolve(self):
-        if not self.func:
+        if not self.func or not self.is_shown():
             # We're not waiting for hw buttons
             return
 
@@ -130,6 +206,9 @@ class YesNoState(object):
             # We still don't know user's decision (call yesno_store() firstly)
             return
 
+        if self._turn_page():
+            return
+
         if self.decision is True:
             ret = self.func(*self.args)
         else:
@@ -141,11 +220,44 @@ class YesNoState(object):
         return ret
 
 
+class FirmwareState(object):
+    '''Streamed firmware upload, only SHA-256 state of the image is kept'''
+    def __init__(self, slot, size, key_id):
+        self.slot = slot
+        self.size = size
+        self.key_id = key_id
+
+        self.received = 0
+        self.hash = hashlib.sha256()
+
+    def is_complete(self):
+        return self.received == self.size
+
+    def _chunk_length(self):
+        return min(FIRMWARE_CHUNK_SIZE, self.size - self.received)
+
+    def request(self):
+        return proto.FirmwareChunkRequest(offset=self.received, length=self._chunk_length())
+
+    def update(self, data):
+        if len(data) != self._chunk_length():
+            raise Exception("Expected chunk of %d bytes, got %d" % (self._chunk_length(), len(data)))
+
+        self.hash.update(data)
+        self.received += len(data)
+
+
 class StateMachine(object):
-    def __init__(self, keyfile, layout):
-        self.keyfile = keyfile
+    def __init__(self, keyring, layout, wakeup=None):
+        self.keyring = keyring
         self.layout = layout
 
+        # Called from worker thread when signing job has something for poll_job(),
+        # jobs run synchronously without it
+        self.wakeup = wakeup
+        self.job = None
+        self.prepared = None  # Future of the question waiting for the operator
+
         self.yesno = YesNoState(layout)
 
         self.set_main_state()
@@ -160,8 +272,32 @@ class StateMachine(object):
             *args - arguments for func
         '''  
 
-        # If confirmed, call final function directly
-        return self.yesno.request(yesno_message, question, yes_text, no_text, func, *args)
+        # If confirmed, run final function as a job off the main loop
+        return self.yesno.request(yesno_message, question, yes_text, no_text, self._start_job, func, *args)
+
+    def protect_call_pages(self, pages, func, *args):
+        # Like protect_call, but the operator may browse the pages before confirming
+        return self.yesno.request_pages(pages, self._start_job, func, *args)
+
+    def _start_job(self, func, *args):
+        self.job = Job(func, args, self.wakeup)
+        self.layout.show_progress(0, 1, True)
+        self.job.start()
+        return self.poll_job()
+
+    def poll_job(self):
+        '''Return responses produced by the signing job so far, update its progress'''
+        if self.job is None:
+            return None
+
+        (responses, (current, maximum), done) = self.job.poll()
+        if done:
+            self.job = None
+            self.set_main_state()
+        else:
+            self.layout.show_progress(current, maximum)
+
+        return responses
 
     def clear_custom_message(self):
         if self.custom_message:
@@ -169,6 +305,13 @@ class StateMachine(object):
             self.layout.show_logo(None, self.storage.get_label())
 
     def press_button(self, button):
+        if self.job is not None:
+            if button is False:
+                # Job stops at its next step, its results are dropped
+                self.set_main_state()
+                return proto.Failure(code=proto.Failure_ActionCancelled, message='Action cancelled by user')
+            return None
+
         if button and self.custom_message:
             self.clear_custom_message()
 
@@ -187,20 +330,141 @@ class StateMachine(object):
         # but doesn't require any interaction with computer
         self.custom_message = False
 
-        self.layout.show_logo(None, "FIRMWARE SIGNER")
+        # Firmware upload in progress
+        self.firmware = None
 
-    def _sign_plugin_config(self, config, protospec):
-        key_pem = open(os.path.expanduser('~/.trezor_key.pem'), 'r').read()
-        payload = sign_plugin.sign(key_pem, config, protospec)
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
 
-        self.set_main_state()
-        return proto.SignedObject(payload=payload)
+        self._cancel_prepared()
+
+        self.layout.show_logo(None, "FIRMWARE SIGNER")
+
+    def _cancel_prepared(self):
+        # Speculative work for a cancelled question stops at its next step
+        if self.prepared is not None:
+            self.prepared.cancel()
+            self.prepared = None
+
+    # Following functions run on worker thread (see job.Job and job.Future),
+    # they must not touch the layout
+
+    def _prepare(self, future, config, protospec):
+        return sign_plugin.prepare(config, protospec)
+
+    def _prepare_batch(self, future, configs, protospec):
+        return sign_plugin.prepare_batch(configs, protospec, future.check)
+
+    def _sign_plugin_config(self, job, prepared, key_id):
+        key = self.keyring.get(key_id)
+        data = prepared.result()
+        return proto.SignedObject(payload=sign_plugin.sign_prepared(key, data))
+
+    def _sign_plugin_batch(self, job, prepared, key_id):
+        # Every SignedObject is sent as soon as it's ready
+        key = self.keyring.get(key_id)
+        items = prepared.result()
+        for i in range(len(items)):
+            job.report(i, len(items))
+            job.send(proto.SignedObject(payload=sign_plugin.sign_prepared(key, items[i]), index=i))
+
+    def _sign_plugin_merkle(self, job, prepared, key_id):
+        # Everything is signed at once, objects are streamed afterwards
+        key = self.keyring.get(key_id)
+        payloads = sign_plugin.sign_merkle(key, prepared.result())
+        for i in range(len(payloads)):
+            job.send(proto.SignedObject(payload=payloads[i], index=i))
+
+    def _sign_digest(self, job, digest, key_id):
+        key = self.keyring.get(key_id)
+        signature = sign_plugin.sign_host_digest(digest, key)
+        return proto.SignedObject(payload=signature)
+
+    def _sign_firmware(self, job, firmware):
+        key = self.keyring.get(firmware.key_id)
+        signature = sign_plugin.sign_digest(firmware.hash.digest(), key)
+        return proto.SignedObject(payload=signature)
+
+    def _process_firmware_chunk(self, msg):
+        if self.firmware is None:
+            return proto.Failure(code=proto.Failure_UnexpectedMessage, message="No firmware upload in progress")
+
+        firmware = self.firmware
+        firmware.update(msg.data)
+        self.layout.show_progress(firmware.received, firmware.size)
+
+        if not firmware.is_complete():
+            return firmware.request()
+
+        self.firmware = None
+        digest = firmware.hash.hexdigest()
+        print "Firmware uploaded, %d bytes, SHA-256 %s" % (firmware.size, digest)
+
+        x = self.layout.format_digest(firmware.hash.digest())
+        return self.protect_call(["Slot %d, %d B" % (firmware.slot, firmware.size)] + x, '', '{ Cancel', 'Confirm }', self._sign_firmware, firmware)
 
     def _process_message(self, msg):
+        if self.job is not None:
+            # Failure switches to the main state, which cancels the job
+            return proto.Failure(code=proto.Failure_UnexpectedMessage, message="Signing in progress")
+
+        if isinstance(msg, proto.FirmwareChunk):
+            return self._process_firmware_chunk(msg)
+
+        # Any other message aborts unfinished firmware upload
+        # and the question still waiting for the operator
+        self.firmware = None
+        self.yesno.cancel()
+        self._cancel_prepared()
+
+        if isinstance(msg, proto.SignFirmware):
+            if not msg.size:
+                return proto.Failure(code=proto.Failure_SyntaxError, message="Firmware size must be set")
+
+            self.firmware = FirmwareState(msg.slot, msg.size, msg.key_id)
+            self.layout.show_progress(0, msg.size, True)
+            return self.firmware.request()
+
         if isinstance(msg, proto.SignPluginConfig):
-            s = msg.config
-            x = [ s[i * 21:i * 21 + 21] for i in range(int(math.ceil(len(s) / 21.))) ]
-            return self.protect_call(["Sign plugin config?"] + x, '', '{ Cancel', 'Confirm }', self._sign_plugin_config, msg.config, msg.protospec)
+            error = sign_plugin.check_config(msg.config)
+            if error:
+                return proto.Failure(code=proto.Failure_SyntaxError, message=error)
+
+            # Compile and compose while the operator reads the question,
+            # Confirm then only waits for it and signs
+            self.prepared = Future(self._prepare, msg.config, msg.protospec)
+            return self.protect_call_pages(ConfigPages(msg.config), self._sign_plugin_config, self.prepared, msg.key_id)
+
+        if isinstance(msg, proto.SignDigest):
+            if len(msg.digest) != 32:
+                return proto.Failure(code=proto.Failure_SyntaxError, message="Digest must be 32 bytes of SHA-256")
+
+            print "Sign digest of %s: %s" % (msg.description, binascii.hexlify(msg.digest))
+            x = self.layout.format_digest(msg.digest)
+            return self.protect_call([msg.description[:21] or "Sign digest?"] + x, '', '{ Cancel', 'Confirm }', self._sign_digest, msg.digest, msg.key_id)
+
+        if isinstance(msg, proto.SignPluginConfigBatch):
+            if not len(msg.configs):
+                return proto.Failure(code=proto.Failure_SyntaxError, message="No configs to sign")
+
+            for i in range(len(msg.configs)):
+                error = sign_plugin.check_config(msg.configs[i])
+                if error:
+                    return proto.Failure(code=proto.Failure_SyntaxError, message="Config %d: %s" % (i, error))
+
+            # Operator compares the digest with the one printed by the client
+            digest = hashlib.sha256(msg.SerializeToString()).hexdigest()
+            self.prepared = Future(self._prepare_batch, list(msg.configs), msg.protospec)
+            if msg.merkle:
+                func = self._sign_plugin_merkle
+                title = "configs (Merkle)?"
+            else:
+                func = self._sign_plugin_batch
+                title = "configs?"
+
+            return self.protect_call(["Sign %d plugin" % len(msg.configs), title, "Digest:", digest[:8] + ' ' + digest[8:16]],
+                                     '', '{ Cancel', 'Confirm }', func, self.prepared, msg.key_id)
 
         self.set_main_state()
         return proto.Failure(code=proto.Failure_UnexpectedMessage, message="Unexpected message")
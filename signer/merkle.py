@@ -0,0 +1,132 @@
+'''Merkle tree over signed objects, so a batch costs only one signature.
+
+Leaves are SHA-256 of 0x00 + data, inner nodes SHA-256 of 0x01 + left + right
+(prefixes keep leaves and nodes apart). Node without a sibling is promoted
+to the upper level unchanged. The signed root is SHA-256 of 0x02 + count
+(uint32 BE) + top node, the count fixes shape of the tree, so the same proof
+can't be valid for another index or count. The root is signed once, every
+object then carries the root signature and hashes of its siblings on the
+path to the root.
+
+Signed Merkle datafile (hex encoded like sign_plugin.pack_datafile):
+  signature (64 B) || index (uint32 BE) || count (uint32 BE) || siblings (32 B each) || data
+
+This module doesn't need anything from the device, so it may be used
+by consumers of signed objects for the verification.'''
+
+import struct
+import hashlib
+import binascii
+
+HEADER = struct.Struct('>LL')
+
+
+def leaf_hash(data):
+    return hashlib.sha256('\x00' + data).digest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256('\x01' + left + right).digest()
+
+
+def root_hash(count, top):
+    return hashlib.sha256('\x02' + struct.pack('>L', count) + top).digest()
+
+
+def build_tree(items):
+    '''Return list of tree levels, leaves first and the root last'''
+    if not len(items):
+        raise Exception("Cannot build Merkle tree without items")
+
+    levels = [[leaf_hash(data) for data in items]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        upper = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            upper.append(level[-1])
+        levels.append(upper)
+
+    return levels
+
+
+def get_root(levels):
+    '''Signed root of the tree'''
+    return root_hash(len(levels[0]), levels[-1][0])
+
+
+def get_proof(levels, index):
+    '''Sibling hashes on the path from leaf at index to the root'''
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(level[sibling])
+        index //= 2
+    return proof
+
+
+def get_proof_length(index, count):
+    length = 0
+    while count > 1:
+        if index ^ 1 < count:
+            length += 1
+        index //= 2
+        count = (count + 1) // 2
+    return length
+
+
+def compute_root(data, index, count, proof):
+    '''Root of the tree given by object, its position and inclusion proof,
+       costs O(log count) hashes'''
+    if index >= count or len(proof) != get_proof_length(index, count):
+        raise Exception("Invalid Merkle proof")
+
+    h = leaf_hash(data)
+    siblings = iter(proof)
+    total = count
+    while count > 1:
+        if index % 2:
+            h = node_hash(next(siblings), h)
+        elif index + 1 < count:
+            h = node_hash(h, next(siblings))
+        index //= 2
+        count = (count + 1) // 2
+    return root_hash(total, h)
+
+
+def pack_datafile(signature, index, count, proof, data):
+    if len(signature) != 64:
+        raise Exception("Signature must be 64 bytes long")
+
+    return binascii.hexlify(signature + HEADER.pack(index, count) + ''.join(proof) + data)
+
+
+def unpack_datafile(datafile):
+    '''Return (signature, index, count, proof, data) of signed Merkle datafile'''
+    raw = binascii.unhexlify(datafile.strip())
+    if len(raw) < 64 + HEADER.size:
+        raise Exception("Datafile is too short")
+
+    signature = raw[:64]
+    (index, count) = HEADER.unpack_from(raw, 64)
+
+    pos = 64 + HEADER.size
+    length = get_proof_length(index, count)
+    proof = [raw[pos + i * 32:pos + i * 32 + 32] for i in range(length)]
+    pos += length * 32
+
+    if len(raw) < pos:
+        raise Exception("Datafile is too short")
+
+    return (signature, index, count, proof, raw[pos:])
+
+
+def verify_datafile(datafile, verifying_key):
+    '''Check signed Merkle datafile by python-ecdsa VerifyingKey,
+       returns signed data or raises an exception'''
+    (signature, index, count, proof, data) = unpack_datafile(datafile)
+    root = compute_root(data, index, count, proof)
+
+    # Raises ecdsa.BadSignatureError on failure
+    verifying_key.verify(signature, root, hashfunc=hashlib.sha256)
+    return data
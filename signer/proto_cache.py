@@ -0,0 +1,158 @@
+'''Content-addressed cache of compiled protobuf specifications.
+
+Entries are serialized FileDescriptorSet blobs keyed by SHA-256 of everything
+the compilation depends on. Recently used entries are kept in memory, all
+of them on disk, both bounded by size with least recently used eviction.
+Disk entries are written atomically (temporary file + rename), so another
+signer process never reads a half written entry. The memory part is guarded
+by a lock, so the cache can be shared by signing threads.
+
+Every disk entry starts with SHA-256 of its data and is synced before the
+rename. An entry damaged anyway (power cut on the Pi) fails the check, it
+is removed and reported as a miss, so the spec is simply compiled again.'''
+
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Length of SHA-256 checksum in front of data of every disk entry
+CHECKSUM_SIZE = 32
+
+
+def get_key(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        # Length prefix keeps ('ab', 'c') and ('a', 'bc') apart
+        h.update('%d:' % len(part))
+        h.update(part)
+    return h.hexdigest()
+
+
+class ProtoCache(object):
+    def __init__(self, directory=None, max_disk_size=16 * 1024 * 1024, max_memory_size=4 * 1024 * 1024):
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.max_disk_size = max_disk_size
+        self.max_memory_size = max_memory_size
+
+        self.memory = OrderedDict()  # key -> data, least recently used first
+        self.memory_size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.memory.pop(key, None)
+            if data is not None:
+                self.memory[key] = data
+                return data
+
+        if not self.directory:
+            return None
+
+        path = os.path.join(self.directory, key)
+        try:
+            entry = open(path, 'rb').read()
+            os.utime(path, None)  # Mark as recently used for eviction
+        except (IOError, OSError):
+            return None
+
+        data = entry[CHECKSUM_SIZE:]
+        if len(entry) <= CHECKSUM_SIZE or hashlib.sha256(data).digest() != entry[:CHECKSUM_SIZE]:
+            print "Removing damaged entry %s from proto cache" % key
+            self.remove(key)
+            return None
+
+        self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        self._remember(key, data)
+
+        if not self.directory:
+            return
+
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+
+            (fd, tmp) = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+            try:
+                entry = hashlib.sha256(data).digest() + data
+                while entry:
+                    entry = entry[os.write(fd, entry):]
+                # Content must be on the disk before the entry gets its name
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.rename(tmp, os.path.join(self.directory, key))
+            self._sync_directory()
+
+            self._evict_disk()
+        except (IOError, OSError) as exc:
+            # Cache is an optimization only, signing must go on
+            print "Cannot store compiled proto to cache: %s" % str(exc)
+
+    def remove(self, key):
+        '''Forget the entry, for data that turned out to be unusable'''
+        with self.lock:
+            data = self.memory.pop(key, None)
+            if data is not None:
+                self.memory_size -= len(data)
+
+        if not self.directory:
+            return
+
+        try:
+            os.unlink(os.path.join(self.directory, key))
+        except OSError:
+            # Not on the disk or already removed by another process
+            pass
+
+    def _sync_directory(self):
+        # Makes the rename itself survive a power cut
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _remember(self, key, data):
+        with self.lock:
+            if key in self.memory:
+                self.memory_size -= len(self.memory.pop(key))
+
+            self.memory[key] = data
+            self.memory_size += len(data)
+
+            while self.memory_size > self.max_memory_size and len(self.memory) > 1:
+                (_, old) = self.memory.popitem(last=False)
+                self.memory_size -= len(old)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith('.'):
+                # Temporary file of another writer
+                continue
+
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+
+        entries.sort()
+        total = sum([size for (_, size, _) in entries])
+
+        # Keep at least the newest entry
+        for (_, size, name) in entries[:-1]:
+            if total <= self.max_disk_size:
+                break
+
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                # Already removed by another process
+                pass
+            total -= size
@@ -0,0 +1,939 @@
+'''Pure-Python compiler of .proto files into FileDescriptorSet.
+
+Understands the proto2 subset used by Trezor protocol specifications:
+messages (also nested), enums, extensions, oneofs, reserved fields,
+extension ranges, default values and both standard and custom options
+(like [(binary) = true]). The only importable file is
+google/protobuf/descriptor.proto (taken from the protobuf package) unless
+sources of other imports are given.
+
+Output is byte-identical to `protoc -o` of protoc 3.x (which fills json_name
+of every field), so signing needs neither the protoc binary nor protobuf
+include files on the device.'''
+
+import re
+import ctypes
+import struct
+from google.protobuf import descriptor_pb2
+
+DESCRIPTOR_PROTO = 'google/protobuf/descriptor.proto'
+
+FDP = descriptor_pb2.FieldDescriptorProto
+
+SCALAR_TYPES = {
+    'double': FDP.TYPE_DOUBLE,
+    'float': FDP.TYPE_FLOAT,
+    'int64': FDP.TYPE_INT64,
+    'uint64': FDP.TYPE_UINT64,
+    'int32': FDP.TYPE_INT32,
+    'fixed64': FDP.TYPE_FIXED64,
+    'fixed32': FDP.TYPE_FIXED32,
+    'bool': FDP.TYPE_BOOL,
+    'string': FDP.TYPE_STRING,
+    'bytes': FDP.TYPE_BYTES,
+    'uint32': FDP.TYPE_UINT32,
+    'sfixed32': FDP.TYPE_SFIXED32,
+    'sfixed64': FDP.TYPE_SFIXED64,
+    'sint32': FDP.TYPE_SINT32,
+    'sint64': FDP.TYPE_SINT64,
+}
+
+LABELS = {
+    'optional': FDP.LABEL_OPTIONAL,
+    'required': FDP.LABEL_REQUIRED,
+    'repeated': FDP.LABEL_REPEATED,
+}
+
+INTEGER_TYPES = (FDP.TYPE_INT64, FDP.TYPE_UINT64, FDP.TYPE_INT32, FDP.TYPE_FIXED64, FDP.TYPE_FIXED32,
+                 FDP.TYPE_UINT32, FDP.TYPE_SFIXED32, FDP.TYPE_SFIXED64, FDP.TYPE_SINT32, FDP.TYPE_SINT64)
+
+MAX_FIELD_NUMBER = 536870911
+
+# Field numbers reserved for the protocol buffer library implementation
+RESERVED_FIELD_NUMBERS = (19000, 19999)
+
+# (min, max) of default values of integer types
+INTEGER_RANGES = {
+    FDP.TYPE_INT32: (-2 ** 31, 2 ** 31 - 1),
+    FDP.TYPE_SINT32: (-2 ** 31, 2 ** 31 - 1),
+    FDP.TYPE_SFIXED32: (-2 ** 31, 2 ** 31 - 1),
+    FDP.TYPE_UINT32: (0, 2 ** 32 - 1),
+    FDP.TYPE_FIXED32: (0, 2 ** 32 - 1),
+    FDP.TYPE_INT64: (-2 ** 63, 2 ** 63 - 1),
+    FDP.TYPE_SINT64: (-2 ** 63, 2 ** 63 - 1),
+    FDP.TYPE_SFIXED64: (-2 ** 63, 2 ** 63 - 1),
+    FDP.TYPE_UINT64: (0, 2 ** 64 - 1),
+    FDP.TYPE_FIXED64: (0, 2 ** 64 - 1),
+}
+
+# Types which can't be packed
+UNPACKABLE_TYPES = (FDP.TYPE_STRING, FDP.TYPE_BYTES, FDP.TYPE_MESSAGE, FDP.TYPE_GROUP)
+
+TOKEN_RE = re.compile(r'''
+    (?P<space>\s+) |
+    (?P<comment>//[^\n]*|/\*.*?\*/) |
+    (?P<float>(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?[fF]?|\d+[eE][+-]?\d+[fF]?) |
+    (?P<int>0[xX][0-9a-fA-F]+|\d+) |
+    (?P<ident>[A-Za-z_][A-Za-z0-9_]*) |
+    (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*') |
+    (?P<symbol>.)
+''', re.X | re.S)
+
+ESCAPES = {'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v',
+           '\\': '\\', '?': '?', "'": "'", '"': '"'}
+
+
+class ParseError(Exception):
+    pass
+
+
+def tokenize(source):
+    tokens = []
+    line = 1
+    pos = 0
+    while pos < len(source):
+        m = TOKEN_RE.match(source, pos)
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind not in ('space', 'comment'):
+            tokens.append((kind, value, line))
+        line += value.count('\n')
+        pos = m.end()
+    return tokens
+
+
+def unescape(literal):
+    '''Decode quoted string literal the same way as protoc'''
+    body = literal[1:-1]
+    out = []
+    i = 0
+    while i < len(body):
+        c = body[i]
+        i += 1
+        if c != '\\':
+            out.append(c)
+            continue
+
+        c = body[i]
+        i += 1
+        if c in '01234567':
+            digits = re.match('[0-7]{1,3}', body[i - 1:]).group(0)
+            out.append(chr(int(digits, 8) & 0xff))
+            i += len(digits) - 1
+        elif c in 'xX':
+            m = re.match('[0-9a-fA-F]{1,2}', body[i:])
+            if m is None:
+                raise ParseError("Expected hex digits for escape sequence")
+            out.append(chr(int(m.group(0), 16)))
+            i += len(m.group(0))
+        elif c in 'uU':
+            length = 4 if c == 'u' else 8
+            if not re.match('[0-9a-fA-F]{%d}$' % length, body[i:i + length]):
+                raise ParseError("Expected %d hex digits for unicode escape sequence" % length)
+            try:
+                out.append(unichr(int(body[i:i + length], 16)).encode('utf-8'))
+            except ValueError:
+                raise ParseError("Unicode escape sequence out of range")
+            i += length
+        elif c in ESCAPES:
+            out.append(ESCAPES[c])
+        else:
+            raise ParseError("Invalid escape sequence in string literal")
+    return ''.join(out)
+
+
+def cescape(data):
+    # C-style escaping used by protoc for default values of bytes fields
+    out = []
+    for c in data:
+        if c == '\n':
+            out.append('\\n')
+        elif c == '\r':
+            out.append('\\r')
+        elif c == '\t':
+            out.append('\\t')
+        elif c in '"\'\\':
+            out.append('\\' + c)
+        elif ord(c) < 0x20 or ord(c) >= 0x7f:
+            out.append('\\%03o' % ord(c))
+        else:
+            out.append(c)
+    return ''.join(out)
+
+
+def simple_dtoa(value):
+    # Shortest of %.15g and %.17g which survives the round trip (protoc's SimpleDtoa)
+    if value != value:
+        return 'nan'
+    if value in (float('inf'), float('-inf')):
+        return 'inf' if value > 0 else '-inf'
+    text = '%.15g' % value
+    if float(text) != value:
+        text = '%.17g' % value
+    return text
+
+
+# Smallest normal float
+FLT_MIN = 1.17549435e-38
+
+
+def simple_ftoa(value):
+    # Value rounded to float first, then shortest of %.6g and %.9g which
+    # survives the round trip (protoc's SimpleFtoa)
+    value = ctypes.c_float(value).value
+    if value != value:
+        return 'nan'
+    if value in (float('inf'), float('-inf')):
+        return 'inf' if value > 0 else '-inf'
+    text = '%.6g' % value
+    parsed = ctypes.c_float(float(text)).value
+    # Denormals fail the check too, strtof() reports them as out of range
+    if parsed != value or (parsed and abs(parsed) < FLT_MIN):
+        text = '%.9g' % value
+    return text
+
+
+def parse_int(text):
+    if text[:2] in ('0x', '0X'):
+        return int(text, 16)
+    if len(text) > 1 and text[0] == '0':
+        return int(text, 8)
+    return int(text)
+
+
+def to_json_name(name):
+    result = []
+    capitalize = False
+    for c in name:
+        if c == '_':
+            capitalize = True
+        elif capitalize:
+            result.append(c.upper())
+            capitalize = False
+        else:
+            result.append(c)
+    return ''.join(result)
+
+
+def encode_varint(value):
+    value &= 0xFFFFFFFFFFFFFFFF  # Negative numbers are sent as 64-bit two's complement
+    out = []
+    while True:
+        bits = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(chr(bits | 0x80))
+        else:
+            out.append(chr(bits))
+            return ''.join(out)
+
+
+def join_name(scope, name):
+    return scope + '.' + name if scope else name
+
+
+class Parser(object):
+    '''Recursive descent parser of a single .proto file.
+
+    Builds FileDescriptorProto directly, references (type names, extendees,
+    option names) are collected and resolved by Compiler once all files are
+    parsed.'''
+
+    def __init__(self, source, name):
+        self.tokens = tokenize(source)
+        self.pos = 0
+        self.name = name
+
+        self.file = descriptor_pb2.FileDescriptorProto(name=name)
+        self.package = ''
+        self.imports = []
+
+        self.symbols = {}  # full name -> (kind, descriptor proto)
+        self.types = []  # (field, scope, type name) to resolve
+        self.extendees = []  # (field, scope, extendee name) to resolve
+        self.options = []  # (options message, scope, [(name, value)]) to interpret
+
+    # Token helpers
+
+    def error(self, message):
+        if self.pos < len(self.tokens):
+            line = self.tokens[self.pos][2]
+        else:
+            line = self.tokens[-1][2] if self.tokens else 1
+        return ParseError("%s:%d: %s" % (self.name, line, message))
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos][1]
+        return None
+
+    def next(self):
+        if self.pos >= len(self.tokens):
+            raise self.error("Unexpected end of file")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def try_consume(self, value):
+        if self.peek() == value:
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, value):
+        if not self.try_consume(value):
+            raise self.error("Expected \"%s\", found \"%s\"" % (value, self.peek()))
+
+    def expect_ident(self):
+        (kind, value, _) = self.next()
+        if kind != 'ident':
+            self.pos -= 1
+            raise self.error("Expected identifier, found \"%s\"" % value)
+        return value
+
+    def expect_int(self):
+        (kind, value, _) = self.next()
+        if kind != 'int':
+            self.pos -= 1
+            raise self.error("Expected integer, found \"%s\"" % value)
+        return parse_int(value)
+
+    def expect_string(self):
+        (kind, value, _) = self.next()
+        if kind != 'string':
+            self.pos -= 1
+            raise self.error("Expected string, found \"%s\"" % value)
+
+        # Adjacent literals are concatenated
+        result = unescape(value)
+        while self.pos < len(self.tokens) and self.tokens[self.pos][0] == 'string':
+            result += unescape(self.next()[1])
+        return result
+
+    def expect_field_number(self):
+        number = self.expect_int()
+        if number <= 0:
+            raise self.error("Field numbers must be positive integers")
+        if number > MAX_FIELD_NUMBER:
+            raise self.error("Field number out of bounds (max is %d)" % MAX_FIELD_NUMBER)
+        return number
+
+    def full_ident(self):
+        name = self.expect_ident()
+        while self.try_consume('.'):
+            name += '.' + self.expect_ident()
+        return name
+
+    def type_name(self):
+        if self.try_consume('.'):
+            return '.' + self.full_ident()
+        return self.full_ident()
+
+    def constant(self):
+        # Returns (kind, value) of option value
+        if self.try_consume('-'):
+            (kind, value, _) = self.next()
+            if kind in ('int', 'float') or value in ('inf', 'nan'):
+                return (kind, '-' + value)
+            raise self.error("Expected number after \"-\"")
+
+        if self.peek() == '{':
+            raise self.error("Aggregate option values are not supported")
+
+        if self.pos < len(self.tokens) and self.tokens[self.pos][0] == 'string':
+            return ('string', self.expect_string())
+
+        (kind, value, _) = self.next()
+        if kind not in ('int', 'float', 'ident'):
+            self.pos -= 1
+            raise self.error("Expected option value, found \"%s\"" % value)
+        return (kind, value)
+
+    def option_name(self):
+        # Returns name of standard option or "(extension.name)" of custom one
+        if self.try_consume('('):
+            name = '(' + self.type_name() + ')'
+            self.expect(')')
+            if self.peek() == '.':
+                raise self.error("Options of message type are not supported")
+            return name
+        return self.expect_ident()
+
+    def register(self, name, kind, proto):
+        if name in self.symbols:
+            raise self.error("\"%s\" is already defined" % name)
+        self.symbols[name] = (kind, proto)
+
+    # Grammar
+
+    def parse(self):
+        while self.peek() is not None:
+            token = self.peek()
+            if self.try_consume(';'):
+                continue
+            elif token == 'syntax':
+                self.next()
+                self.expect('=')
+                syntax = self.expect_string()
+                if syntax != 'proto2':
+                    raise self.error("Only proto2 syntax is supported")
+                self.expect(';')
+            elif token == 'package':
+                self.next()
+                self.package = self.full_ident()
+                self.file.package = self.package
+                parts = self.package.split('.')
+                for i in range(len(parts)):
+                    self.symbols['.'.join(parts[:i + 1])] = ('package', None)
+                self.expect(';')
+            elif token == 'import':
+                self.parse_import()
+            elif token == 'option':
+                self.next()
+                self.parse_option(self.file.options, self.package)
+                self.expect(';')
+            elif token == 'message':
+                self.next()
+                self.parse_message(self.file.message_type.add(), self.package)
+            elif token == 'enum':
+                self.next()
+                self.parse_enum(self.file.enum_type.add(), self.package)
+            elif token == 'extend':
+                self.next()
+                self.parse_extend(self.file.extension, self.package)
+            else:
+                raise self.error("Expected top-level statement, found \"%s\"" % token)
+
+        return self.file
+
+    def parse_import(self):
+        self.expect('import')
+        if self.try_consume('public'):
+            self.file.public_dependency.append(len(self.file.dependency))
+        elif self.try_consume('weak'):
+            self.file.weak_dependency.append(len(self.file.dependency))
+
+        name = self.expect_string()
+        self.file.dependency.append(name)
+        self.imports.append(name)
+        self.expect(';')
+
+    def parse_option(self, options, scope):
+        # Option statement or one item of field options list
+        name = self.option_name()
+        self.expect('=')
+        value = self.constant()
+        self.add_option(options, scope, name, value)
+
+    def add_option(self, options, scope, name, value):
+        for item in self.options:
+            if item[0] is options:
+                item[2].append((name, value))
+                return
+        self.options.append((options, scope, [(name, value)]))
+
+    def parse_message(self, msg, scope):
+        msg.name = self.expect_ident()
+        full_name = join_name(scope, msg.name)
+        self.register(full_name, 'message', msg)
+
+        self.expect('{')
+        while not self.try_consume('}'):
+            token = self.peek()
+            if self.try_consume(';'):
+                continue
+            elif token == 'message':
+                self.next()
+                self.parse_message(msg.nested_type.add(), full_name)
+            elif token == 'enum':
+                self.next()
+                self.parse_enum(msg.enum_type.add(), full_name)
+            elif token == 'extend':
+                self.next()
+                self.parse_extend(msg.extension, full_name)
+            elif token == 'extensions':
+                self.next()
+                self.parse_ranges(msg.extension_range)
+            elif token == 'reserved':
+                self.next()
+                self.parse_reserved(msg)
+            elif token == 'option':
+                self.next()
+                self.parse_option(msg.options, full_name)
+                self.expect(';')
+            elif token == 'oneof':
+                self.next()
+                self.parse_oneof(msg, full_name)
+            elif token in ('map', 'group') and self.tokens[self.pos + 1][1] not in ('=', '.'):
+                raise self.error("Map and group fields are not supported")
+            elif token in LABELS:
+                self.next()
+                self.parse_field(msg.field.add(), full_name, LABELS[token])
+            else:
+                raise self.error("Expected field label, found \"%s\"" % token)
+
+    def parse_oneof(self, msg, scope):
+        index = len(msg.oneof_decl)
+        msg.oneof_decl.add(name=self.expect_ident())
+
+        self.expect('{')
+        while not self.try_consume('}'):
+            if self.try_consume(';'):
+                continue
+            if self.try_consume('option'):
+                self.parse_option(msg.oneof_decl[index].options, scope)
+                self.expect(';')
+                continue
+
+            field = msg.field.add()
+            field.oneof_index = index
+            self.parse_field(field, scope, FDP.LABEL_OPTIONAL, label_given=False)
+
+    def parse_extend(self, fields, scope):
+        extendee = self.type_name()
+
+        self.expect('{')
+        while not self.try_consume('}'):
+            if self.try_consume(';'):
+                continue
+
+            label = self.expect_ident()
+            if label not in LABELS:
+                self.pos -= 1
+                raise self.error("Expected field label, found \"%s\"" % label)
+
+            field = fields.add()
+            self.extendees.append((field, scope, extendee))
+            self.parse_field(field, scope, LABELS[label], is_extension=True)
+
+    def parse_field(self, field, scope, label, is_extension=False, label_given=True):
+        type_name = self.type_name()
+
+        field.name = self.expect_ident()
+        self.expect('=')
+        field.number = self.expect_field_number()
+        field.label = label
+
+        if RESERVED_FIELD_NUMBERS[0] <= field.number <= RESERVED_FIELD_NUMBERS[1]:
+            raise self.error("Field numbers %d through %d are reserved for the protocol buffer library "
+                             "implementation" % RESERVED_FIELD_NUMBERS)
+
+        if type_name in SCALAR_TYPES:
+            field.type = SCALAR_TYPES[type_name]
+        else:
+            # Message or enum, will be known after resolving
+            self.types.append((field, scope, type_name))
+
+        json_name = None
+        if self.try_consume('['):
+            while True:
+                if self.try_consume('default'):
+                    self.expect('=')
+                    field.default_value = self.parse_default(field)
+                elif self.try_consume('json_name'):
+                    self.expect('=')
+                    json_name = self.expect_string()
+                else:
+                    self.parse_option(field.options, scope)
+
+                if self.try_consume(']'):
+                    break
+                self.expect(',')
+
+        self.expect(';')
+        field.json_name = to_json_name(field.name) if json_name is None else json_name
+        self.register(join_name(scope, field.name), 'extension' if is_extension else 'field', field)
+
+    def parse_default(self, field):
+        if not field.HasField('type'):
+            # Enum value (messages can't have defaults)
+            return self.expect_ident()
+
+        if field.type in (FDP.TYPE_STRING, FDP.TYPE_BYTES):
+            value = self.expect_string()
+            if field.type == FDP.TYPE_BYTES:
+                return cescape(value)
+            return value.decode('utf-8')
+
+        if field.type == FDP.TYPE_BOOL:
+            value = self.expect_ident()
+            if value not in ('true', 'false'):
+                raise self.error("Expected \"true\" or \"false\"")
+            return value
+
+        sign = '-' if self.try_consume('-') else ''
+        (kind, value, _) = self.next()
+
+        if field.type in INTEGER_TYPES:
+            if kind != 'int':
+                raise self.error("Expected integer for field default value")
+            (low, high) = INTEGER_RANGES[field.type]
+            if sign and low == 0:
+                raise self.error("Unsigned field can't have negative default value")
+            number = -parse_int(value) if sign else parse_int(value)
+            if number < low or number > high:
+                raise self.error("Integer out of range")
+            return str(number)
+
+        # Float or double, integers and inf/nan are accepted too
+        if kind == 'int':
+            number = float(parse_int(value))
+        elif kind == 'float':
+            number = float(value.rstrip('fF'))
+        elif value in ('inf', 'nan'):
+            number = float(value)
+        else:
+            raise self.error("Expected number")
+        if field.type == FDP.TYPE_FLOAT:
+            return sign + simple_ftoa(number)
+        return sign + simple_dtoa(number)
+
+    def parse_ranges(self, ranges):
+        # "extensions 100 to 199, 1000 to max;"
+        while True:
+            start = self.expect_field_number()
+            end = start
+            if self.try_consume('to'):
+                if self.try_consume('max'):
+                    end = MAX_FIELD_NUMBER
+                else:
+                    end = self.expect_field_number()
+            if end < start:
+                raise self.error("Range end must not be lower than its start")
+
+            ranges.add(start=start, end=end + 1)  # End is exclusive
+
+            if self.try_consume(';'):
+                break
+            self.expect(',')
+
+    def parse_reserved(self, msg):
+        if self.pos < len(self.tokens) and self.tokens[self.pos][0] == 'string':
+            while True:
+                msg.reserved_name.append(self.expect_string())
+                if self.try_consume(';'):
+                    break
+                self.expect(',')
+        else:
+            self.parse_ranges(msg.reserved_range)
+
+    def parse_enum(self, enum, scope):
+        enum.name = self.expect_ident()
+        self.register(join_name(scope, enum.name), 'enum', enum)
+
+        self.expect('{')
+        while not self.try_consume('}'):
+            if self.try_consume(';'):
+                continue
+            if self.try_consume('option'):
+                self.parse_option(enum.options, scope)
+                self.expect(';')
+                continue
+            if self.try_consume('reserved'):
+                raise self.error("Reserved enum values are not supported")
+
+            value = enum.value.add()
+            value.name = self.expect_ident()
+            self.expect('=')
+            negative = self.try_consume('-')
+            number = -self.expect_int() if negative else self.expect_int()
+            if number < -2 ** 31 or number > 2 ** 31 - 1:
+                raise self.error("Integer out of range")
+            value.number = number
+
+            if self.try_consume('['):
+                while True:
+                    self.parse_option(value.options, scope)
+                    if self.try_consume(']'):
+                        break
+                    self.expect(',')
+            self.expect(';')
+
+            # Enum values are siblings of the enum type in C++ scoping
+            self.register(join_name(scope, value.name), 'enum_value', value)
+
+
+class Compiler(object):
+    def __init__(self, imports=None):
+        self.imports = imports or {}  # file name -> source of importable files
+        self.parsed = {}  # file name -> Parser
+        self.symbols = {}
+        self.extension_numbers = {}  # (extendee, number) -> name of extension
+
+        self._add_descriptor_proto()
+
+    def _add_descriptor_proto(self):
+        # Types from descriptor.proto are taken from the protobuf library
+        self.symbols['google'] = ('package', None)
+        self.symbols['google.protobuf'] = ('package', None)
+
+        def add_message(desc):
+            proto = descriptor_pb2.DescriptorProto()
+            desc.CopyToProto(proto)
+            self.symbols[desc.full_name] = ('message', proto)
+            for nested in desc.nested_types:
+                add_message(nested)
+            for enum in desc.enum_types:
+                add_enum(enum)
+
+        def add_enum(desc):
+            proto = descriptor_pb2.EnumDescriptorProto()
+            desc.CopyToProto(proto)
+            self.symbols[desc.full_name] = ('enum', proto)
+
+        for desc in descriptor_pb2.DESCRIPTOR.message_types_by_name.values():
+            add_message(desc)
+        for enum in descriptor_pb2.DESCRIPTOR.enum_types_by_name.values():
+            add_enum(enum)
+
+    def _parse_file(self, source, name):
+        parser = Parser(source, name)
+        parser.parse()
+        self.parsed[name] = parser
+
+        for imp in parser.imports:
+            if imp == DESCRIPTOR_PROTO or imp in self.parsed:
+                continue
+            if imp not in self.imports:
+                raise ParseError("%s: Import \"%s\" was not found" % (name, imp))
+            self._parse_file(self.imports[imp], imp)
+
+        for (symbol, value) in parser.symbols.items():
+            if symbol in self.symbols and value[0] != 'package':
+                raise ParseError("%s: \"%s\" is already defined" % (name, symbol))
+            self.symbols[symbol] = value
+
+        return parser
+
+    def lookup(self, name, scope):
+        '''Find symbol by name relative to scope, returns (full name, kind, proto)'''
+        if name.startswith('.'):
+            item = self.symbols.get(name[1:])
+            return (name[1:],) + item if item else None
+
+        first = name.split('.')[0]
+        scope = scope.split('.') if scope else []
+
+        while True:
+            prefix = '.'.join(scope)
+            item = self.symbols.get(join_name(prefix, first))
+
+            if item is not None:
+                if first != name:
+                    # Compound name, look up the rest in the found aggregate
+                    if item[0] in ('package', 'message', 'enum'):
+                        full = join_name(prefix, name)
+                        found = self.symbols.get(full)
+                        return (full,) + found if found else None
+                elif item[0] in ('package', 'message', 'enum', 'extension'):
+                    return (join_name(prefix, name),) + item
+
+            if not scope:
+                return None
+            scope.pop()
+
+    def _resolve(self, parser):
+        for (field, scope, type_name) in parser.types:
+            found = self.lookup(type_name, scope)
+            if found is None or found[1] not in ('message', 'enum'):
+                raise ParseError("%s: \"%s\" is not defined" % (parser.name, type_name))
+
+            field.type = FDP.TYPE_MESSAGE if found[1] == 'message' else FDP.TYPE_ENUM
+            field.type_name = '.' + found[0]
+
+        for (field, scope, extendee) in parser.extendees:
+            found = self.lookup(extendee, scope)
+            if found is None or found[1] != 'message':
+                raise ParseError("%s: \"%s\" is not defined" % (parser.name, extendee))
+            field.extendee = '.' + found[0]
+
+        for (options, scope, items) in parser.options:
+            self._interpret_options(parser, options, scope, items)
+
+    def _interpret_options(self, parser, options, scope, items):
+        # Standard options are set directly, custom ones are serialized
+        # as unknown fields after them in order of appearance (as protoc does)
+        custom = []
+        for (name, value) in items:
+            if name.startswith('('):
+                custom.append(self._encode_custom_option(parser, options, scope, name[1:-1], value))
+                continue
+
+            field = options.DESCRIPTOR.fields_by_name.get(name)
+            if field is None:
+                raise ParseError("%s: Option \"%s\" unknown" % (parser.name, name))
+            setattr(options, name, self._option_value(parser, field.type, value, field.enum_type))
+
+        if len(custom):
+            data = options.SerializeToString() + ''.join(custom)
+            options.Clear()
+            options.MergeFromString(data)
+        else:
+            # Mark options as present even when all of them have default values
+            options.SetInParent()
+
+    def _option_value(self, parser, field_type, value, enum_type=None):
+        (kind, text) = value
+        if field_type == FDP.TYPE_BOOL:
+            if text not in ('true', 'false'):
+                raise ParseError("%s: Value must be \"true\" or \"false\"" % parser.name)
+            return text == 'true'
+
+        if field_type == FDP.TYPE_ENUM:
+            if enum_type is None or text not in enum_type.values_by_name:
+                raise ParseError("%s: Unknown enum value \"%s\"" % (parser.name, text))
+            return enum_type.values_by_name[text].number
+
+        if field_type in (FDP.TYPE_STRING, FDP.TYPE_BYTES):
+            if kind != 'string':
+                raise ParseError("%s: Value must be quoted string" % parser.name)
+            return text
+
+        if field_type in (FDP.TYPE_FLOAT, FDP.TYPE_DOUBLE):
+            return float(text.rstrip('fF')) if kind != 'int' else float(parse_int(text.lstrip('-'))) * (
+                -1 if text.startswith('-') else 1)
+
+        if kind != 'int':
+            raise ParseError("%s: Value must be integer" % parser.name)
+        if text.startswith('-'):
+            number = -parse_int(text[1:])
+        else:
+            number = parse_int(text)
+
+        (low, high) = INTEGER_RANGES[field_type]
+        if number < low or number > high:
+            raise ParseError("%s: Value out of range for integer option" % parser.name)
+        return number
+
+    def _encode_custom_option(self, parser, options, scope, name, value):
+        found = self.lookup(name, scope)
+        if found is None or found[1] != 'extension':
+            raise ParseError("%s: Option \"(%s)\" unknown" % (parser.name, name))
+
+        ext = found[2]
+        if ext.extendee != '.' + options.DESCRIPTOR.full_name:
+            raise ParseError("%s: Option \"(%s)\" is not an extension of %s" %
+                             (parser.name, name, options.DESCRIPTOR.full_name))
+
+        enum_values = None
+        if ext.type == FDP.TYPE_ENUM:
+            enum = self.symbols[ext.type_name[1:]][1]
+            enum_values = dict([(v.name, v.number) for v in enum.value])
+            if value[1] not in enum_values:
+                raise ParseError("%s: Unknown enum value \"%s\"" % (parser.name, value[1]))
+            number = enum_values[value[1]]
+        elif ext.type == FDP.TYPE_MESSAGE:
+            raise ParseError("%s: Options of message type are not supported" % parser.name)
+        else:
+            number = self._option_value(parser, ext.type, value)
+
+        t = ext.type
+        if t in (FDP.TYPE_FLOAT, FDP.TYPE_FIXED32, FDP.TYPE_SFIXED32):
+            fmt = {FDP.TYPE_FLOAT: '<f', FDP.TYPE_FIXED32: '<I', FDP.TYPE_SFIXED32: '<i'}[t]
+            return encode_varint(ext.number << 3 | 5) + struct.pack(fmt, number)
+        if t in (FDP.TYPE_DOUBLE, FDP.TYPE_FIXED64, FDP.TYPE_SFIXED64):
+            fmt = {FDP.TYPE_DOUBLE: '<d', FDP.TYPE_FIXED64: '<Q', FDP.TYPE_SFIXED64: '<q'}[t]
+            return encode_varint(ext.number << 3 | 1) + struct.pack(fmt, number)
+        if t in (FDP.TYPE_STRING, FDP.TYPE_BYTES):
+            return encode_varint(ext.number << 3 | 2) + encode_varint(len(number)) + number
+        if t == FDP.TYPE_SINT32:
+            number = (number << 1) ^ (number >> 31)
+        elif t == FDP.TYPE_SINT64:
+            number = (number << 1) ^ (number >> 63)
+        return encode_varint(ext.number << 3) + encode_varint(int(number))
+
+    def _validate(self, parser):
+        # Semantic checks of protoc, specs failing them must not be signed
+        extensions = []
+        for msg in parser.file.message_type:
+            self._validate_message(parser, msg, join_name(parser.package, msg.name), extensions)
+        for enum in parser.file.enum_type:
+            self._validate_enum(parser, enum, join_name(parser.package, enum.name))
+        extensions.extend(parser.file.extension)
+
+        for field in extensions:
+            self._validate_field(parser, field, field.name)
+
+            extendee = self.symbols[field.extendee[1:]][1]
+            if not [r for r in extendee.extension_range if r.start <= field.number < r.end]:
+                raise ParseError("%s: \"%s\" does not declare %d as an extension number" %
+                                 (parser.name, field.extendee[1:], field.number))
+
+            key = (field.extendee, field.number)
+            if key in self.extension_numbers:
+                raise ParseError("%s: Extension number %d has already been used in \"%s\" by extension \"%s\"" %
+                                 (parser.name, field.number, field.extendee[1:], self.extension_numbers[key]))
+            self.extension_numbers[key] = field.name
+
+    def _validate_message(self, parser, msg, full_name, extensions):
+        numbers = {}
+        for field in msg.field:
+            self._validate_field(parser, field, join_name(full_name, field.name))
+
+            if field.number in numbers:
+                raise ParseError("%s: Field number %d has already been used in \"%s\" by field \"%s\"" %
+                                 (parser.name, field.number, full_name, numbers[field.number]))
+            numbers[field.number] = field.name
+
+            if [r for r in msg.reserved_range if r.start <= field.number < r.end]:
+                raise ParseError("%s: Field \"%s\" uses reserved number %d" % (parser.name, field.name, field.number))
+            if field.name in msg.reserved_name:
+                raise ParseError("%s: Field name \"%s\" is reserved" % (parser.name, field.name))
+
+            if [r for r in msg.extension_range if r.start <= field.number < r.end]:
+                raise ParseError("%s: Extension range includes field \"%s\" (%d)" %
+                                 (parser.name, field.name, field.number))
+
+        for nested in msg.nested_type:
+            self._validate_message(parser, nested, join_name(full_name, nested.name), extensions)
+        for enum in msg.enum_type:
+            self._validate_enum(parser, enum, join_name(full_name, enum.name))
+        extensions.extend(msg.extension)
+
+    def _validate_field(self, parser, field, full_name):
+        if field.options.packed and (field.label != FDP.LABEL_REPEATED or field.type in UNPACKABLE_TYPES):
+            raise ParseError("%s: \"%s\": [packed = true] can only be specified for repeated primitive fields" %
+                             (parser.name, full_name))
+
+        if not field.HasField('default_value'):
+            return
+
+        if field.type == FDP.TYPE_MESSAGE:
+            raise ParseError("%s: \"%s\": Messages can't have default values" % (parser.name, full_name))
+
+        if field.type == FDP.TYPE_ENUM:
+            enum = self.symbols[field.type_name[1:]][1]
+            if field.default_value not in [v.name for v in enum.value]:
+                raise ParseError("%s: Enum type \"%s\" has no value named \"%s\"" %
+                                 (parser.name, field.type_name[1:], field.default_value))
+
+    def _validate_enum(self, parser, enum, full_name):
+        if not len(enum.value):
+            raise ParseError("%s: Enum \"%s\" must contain at least one value" % (parser.name, full_name))
+
+        if enum.options.allow_alias:
+            return
+
+        numbers = {}
+        for value in enum.value:
+            if value.number in numbers:
+                raise ParseError("%s: \"%s\" uses the same enum value as \"%s\", set "
+                                 "'option allow_alias = true;' if this is intended" %
+                                 (parser.name, value.name, numbers[value.number]))
+            numbers[value.number] = value.name
+
+    def compile(self, source, name):
+        parser = self._parse_file(source, name)
+        for p in self.parsed.values():
+            self._resolve(p)
+        for p in self.parsed.values():
+            self._validate(p)
+
+        result = descriptor_pb2.FileDescriptorSet()
+        result.file.add().CopyFrom(parser.file)
+        return result
+
+
+def compile_proto(source, name='trezor.proto', imports=None):
+    '''Compile .proto source to serialized FileDescriptorSet, like `protoc -o`'''
+    return Compiler(imports).compile(source, name).SerializeToString()
@@ -0,0 +1,87 @@
+'''Reactor is select() based main loop of the signer.
+
+Transports and button inputs register file descriptors (or any object
+with fileno()), layout scrolling and other periodic work run on timers.
+Reactor sleeps in select() until some descriptor is readable or the nearest
+timer expires, so an idle signer doesn't wake up at all.'''
+
+import os
+import time
+import errno
+import heapq
+from select import select, error as select_error
+
+
+class Reactor(object):
+    def __init__(self):
+        self.readers = {}  # fileobj -> callback
+        self.timers = []  # heap of (deadline, seq, callback)
+        self.seq = 0
+        self.pending = []  # callbacks scheduled from other threads
+        self.running = False
+
+        # Self-pipe for waking up select() from other threads
+        # (like RPi.GPIO edge callbacks)
+        (self.wakeup_r, self.wakeup_w) = os.pipe()
+
+    def add_reader(self, fileobj, callback):
+        self.readers[fileobj] = callback
+
+    def remove_reader(self, fileobj):
+        self.readers.pop(fileobj, None)
+
+    def call_later(self, delay, callback):
+        self.seq += 1
+        heapq.heappush(self.timers, (time.time() + delay, self.seq, callback))
+
+    def call_soon_threadsafe(self, callback):
+        self.pending.append(callback)
+        os.write(self.wakeup_w, 'x')
+
+    def run(self, after_iteration=None):
+        self.running = True
+        while self.running:
+            self.run_once()
+            if after_iteration is not None:
+                after_iteration()
+
+    def stop(self):
+        self.running = False
+
+    def close(self):
+        os.close(self.wakeup_r)
+        os.close(self.wakeup_w)
+
+    def _timeout(self):
+        if self.pending:
+            return 0
+        if not self.timers:
+            return None  # Sleep until some descriptor is ready
+        return max(0, self.timers[0][0] - time.time())
+
+    def run_once(self):
+        rlist = [self.wakeup_r] + list(self.readers.keys())
+        try:
+            rlist, _, _ = select(rlist, [], [], self._timeout())
+        except select_error as exc:
+            if exc.args[0] != errno.EINTR:
+                raise
+            # Interrupted by a signal, timers are handled below
+            rlist = []
+
+        for fileobj in rlist:
+            if fileobj == self.wakeup_r:
+                os.read(self.wakeup_r, 4096)
+                continue
+
+            callback = self.readers.get(fileobj)
+            if callback is not None:
+                callback()
+
+        while self.pending:
+            self.pending.pop(0)()
+
+        now = time.time()
+        while self.timers and self.timers[0][0] <= now:
+            (_, _, callback) = heapq.heappop(self.timers)
+            callback()
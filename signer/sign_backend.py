@@ -0,0 +1,88 @@
+'''Backends producing deterministic (RFC 6979) ECDSA signatures.
+
+All backends take python-ecdsa SigningKey and return the same 64-byte raw
+signature (r || s) as SigningKey.sign_deterministic with SHA-256. Data
+hashed incrementally (like streamed firmware) are signed by sign_digest().
+
+EcdsaBackend is the pure-Python reference. OpensslBackend derives the nonce
+with python-ecdsa's own RFC 6979 code (just a few HMACs) and lets OpenSSL
+(through the cryptography package) compute the expensive point k*G. The rest
+is a cheap modular arithmetic, so the result is byte-identical.'''
+
+import hashlib
+from ecdsa import rfc6979
+from ecdsa.util import number_to_string, string_to_number
+from ecdsa.numbertheory import inverse_mod
+
+
+class EcdsaBackend(object):
+    name = 'ecdsa'
+
+    def sign(self, key, data):
+        return self.sign_digest(key, hashlib.sha256(data).digest())
+
+    def sign_digest(self, key, digest):
+        # Curves shorter than SHA-256 (NIST224p) need the digest truncated,
+        # allow_truncate is there since python-ecdsa 0.14
+        return key.sign_digest_deterministic(digest, hashfunc=hashlib.sha256, allow_truncate=True)
+
+
+class OpensslBackend(object):
+    name = 'openssl'
+
+    def __init__(self):
+        # Raises ImportError when cryptography is not installed
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives.asymmetric import ec
+
+        self.ec = ec
+        self.backend = default_backend()
+        self.curves = {
+            'SECP256k1': ec.SECP256K1,
+            'NIST224p': ec.SECP224R1,
+            'NIST256p': ec.SECP256R1,
+            'NIST384p': ec.SECP384R1,
+            'NIST521p': ec.SECP521R1,
+        }
+        self.reference = EcdsaBackend()
+
+    def sign(self, key, data):
+        return self.sign_digest(key, hashlib.sha256(data).digest())
+
+    def sign_digest(self, key, digest):
+        order = key.curve.order
+
+        if key.curve.name not in self.curves or order.bit_length() < len(digest) * 8:
+            # Unknown curve or digest would need truncation
+            return self.reference.sign_digest(key, digest)
+
+        secexp = key.privkey.secret_multiplier
+        k = rfc6979.generate_k(order, secexp, hashlib.sha256, digest)
+
+        point = self.ec.derive_private_key(k, self.curves[key.curve.name](), self.backend)
+        r = point.public_key().public_numbers().x % order
+        s = (inverse_mod(k, order) * (string_to_number(digest) + secexp * r)) % order
+
+        if r == 0 or s == 0:
+            # Reference implementation retries with another nonce
+            return self.reference.sign_digest(key, digest)
+
+        return number_to_string(r, order) + number_to_string(s, order)
+
+
+BACKENDS = [OpensslBackend, EcdsaBackend]  # Ordered by preference
+
+
+def get_backend(name='auto'):
+    '''Return backend by its name, 'auto' picks the fastest available one'''
+    for cls in BACKENDS:
+        if name not in ('auto', cls.name):
+            continue
+
+        try:
+            return cls()
+        except ImportError:
+            if name != 'auto':
+                raise
+
+    raise Exception("Unknown signing backend %s" % name)
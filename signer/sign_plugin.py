@@ -1,49 +1,149 @@
 #!/usr/bin/python
 import subprocess
 import os
+import shutil
+import tempfile
 import json
 import time
 import ecdsa
 import hashlib
 import binascii
 from google.protobuf.descriptor_pb2 import FileDescriptorSet
+from google.protobuf.message import DecodeError
+
+# Generated from protob/config.proto by protob/build.sh
+import config_pb2
+import sign_backend
+import merkle
+import protoparser
+from proto_cache import ProtoCache, get_key
 
 PROTOBUF_PROTO_DIR=os.environ.get('PROTOBUF_PROTO_DIR', '/usr/include/')
 TREZOR_PROTO_DIR = os.environ.get('TREZOR_PROTO_DIR', '/tmp/')
+PROTO_CACHE_DIR = os.environ.get('PROTO_CACHE_DIR', '~/.cache/trezor-signer/proto')
+
+# Domain of SignDigest signatures, see get_host_digest_message()
+HOST_DIGEST_PREFIX = '\x00trezor-signer SignDigest\x00'
+
+# Compiled protospecs (serialized FileDescriptorSet)
+proto_cache = ProtoCache(PROTO_CACHE_DIR)
 
-def compile_config():
-    cmd = "protoc --python_out=. -I" + PROTOBUF_PROTO_DIR + " -I. protob/config.proto"
-    subprocess.check_call(cmd.split())
+# Reference implementation until set_backend() is called at startup
+backend = sign_backend.EcdsaBackend()
+
+def set_backend(name):
+    global backend
+    backend = sign_backend.get_backend(name)
+    print "Signing backend:", backend.name
 
 def parse_json(config_json):
     return json.loads(open(config_json, 'r').read())
 
 
-def get_compiled_proto(proto):
-    # Compile trezor.proto to binary format
-    pdir = os.path.abspath(TREZOR_PROTO_DIR)
-    pfile = os.path.join(pdir, "trezor.proto")
+def _compile_proto(proto):
+    # Compile trezor.proto to binary format in-process,
+    # protoc is needed only for specs using unsupported syntax
+    try:
+        return protoparser.compile_proto(proto, 'trezor.proto')
+    except protoparser.ParseError as exc:
+        print "Cannot compile protospec in-process (%s), running protoc" % str(exc)
 
-    f = open(pfile, 'w')
-    f.write(proto)
-    f.close()
+    return _run_protoc(proto)
 
-    cmd = "protoc -I" + PROTOBUF_PROTO_DIR + " -I" + pdir  + " " + pfile + " -otrezor.bin"
+def _run_protoc(proto):
+    # Every invocation uses its own directory, so concurrent signings
+    # (in threads or other processes) never overwrite each other's files
+    pdir = tempfile.mkdtemp(prefix='trezor-proto-', dir=TREZOR_PROTO_DIR)
+    try:
+        pfile = os.path.join(pdir, "trezor.proto")
+        out = os.path.join(pdir, "trezor.bin")
 
-    subprocess.check_call(cmd.split())
+        f = open(pfile, 'w')
+        f.write(proto)
+        f.close()
 
-    # Load compiled protocol description to string
-    proto = open('trezor.bin', 'r').read()
-    os.unlink('trezor.bin')
+        subprocess.check_call(["protoc", "-I" + PROTOBUF_PROTO_DIR, "-I" + pdir, pfile, "-o" + out])
+
+        # Load compiled protocol description to string
+        return open(out, 'rb').read()
+    finally:
+        shutil.rmtree(pdir, ignore_errors=True)
+
+def get_compiled_proto(proto):
+    # Same spec is signed over and over, compile it only once
+    key = get_key(proto, PROTOBUF_PROTO_DIR)
+    data = proto_cache.get(key)
+    if data is not None:
+        compiled = _parse_compiled(data)
+        if compiled is not None:
+            return compiled
+
+        # Cached entry is unusable, it must not end up in a signed config
+        print "Compiled proto in cache is damaged, compiling again"
+        proto_cache.remove(key)
+
+    data = _compile_proto(proto)
+    compiled = _parse_compiled(data)
+    if compiled is None:
+        raise Exception("Compiled protospec is empty or damaged")
+    proto_cache.put(key, data)
+    return compiled
 
-    # Parse it into FileDescriptorSet structure
+def _parse_compiled(data):
+    # Parse it into FileDescriptorSet structure, None if it's not a valid one
     compiled = FileDescriptorSet()
-    compiled.ParseFromString(proto)
+    try:
+        compiled.ParseFromString(data)
+    except DecodeError:
+        return None
+    if not len(compiled.file):
+        return None
     return compiled
 
-def compose_message(json, proto):
-    import config_pb2
+def _is_hex_id(value):
+    try:
+        return isinstance(value, basestring) and 0 <= int(value, 16) < 2 ** 32
+    except ValueError:
+        return False
+
+def check_config(config_json):
+    # Return description of the first problem of config JSON, None if compose_message() accepts it
+    try:
+        config = json.loads(config_json)
+    except ValueError:
+        return "Config is not a valid JSON"
+
+    if not isinstance(config, dict):
+        return "Config must be a JSON object"
+
+    days = config.get('valid_days')
+    if not isinstance(days, (int, long)) or isinstance(days, bool) or days < 0:
+        return "valid_days must be a non-negative integer"
+    if time.time() + days * 3600 * 24 >= 2 ** 31:
+        return "valid_days is too far in the future"
+
+    for name in ('whitelist_urls', 'blacklist_urls'):
+        urls = config.get(name)
+        if not isinstance(urls, list):
+            return "%s must be a list" % name
+        for url in urls:
+            if not isinstance(url, basestring):
+                return "%s must contain only strings" % name
+            try:
+                str(url)
+            except UnicodeError:
+                return "%s must contain only ASCII strings" % name
+
+    devices = config.get('known_devices')
+    if not isinstance(devices, list):
+        return "known_devices must be a list"
+    for dev in devices:
+        if not isinstance(dev, list) or len(dev) != 2 or not _is_hex_id(dev[0]) or not _is_hex_id(dev[1]):
+            return "known_devices must contain [vendor_id, product_id] pairs of hex strings"
+
+    return None
 
+def compose_message(json, proto):
     cfg = config_pb2.Configuration()
     cfg.valid_until = int(time.time()) + json['valid_days'] * 3600 * 24
     cfg.wire_protocol.MergeFrom(proto)
@@ -61,16 +161,26 @@ def compose_message(json, proto):
 
     return cfg.SerializeToString()
 
-def sign_message(data, key_pem):
+def sign_message(data, key):
     # curve = ecdsa.curves.SECP256k1
     # x = ecdsa.keys.SigningKey.generate(curve=curve)
-    key = ecdsa.keys.SigningKey.from_pem(key_pem)
+    # Key is already parsed SigningKey (see keyring.Keyring)
+    return backend.sign(key, data)
+
+def sign_digest(digest, key):
+    # Signature of data hashed by SHA-256 elsewhere, same as sign_message(data, key)
+    return backend.sign_digest(key, digest)
 
-    verify = key.get_verifying_key()
-    print "Verifying key:"
-    print verify.to_pem()
+def get_host_digest_message(digest):
+    # Host can't make the device sign a firmware or a config by SignDigest,
+    # no signed config starts with zero byte (protobuf tag 0 is invalid)
+    # and Merkle roots are 32 bytes only
+    return HOST_DIGEST_PREFIX + digest
 
-    return key.sign_deterministic(data, hashfunc=hashlib.sha256)
+def sign_host_digest(digest, key):
+    # Signature of digest sent by the host (SignDigest), verify it
+    # as signature of get_host_digest_message(digest)
+    return sign_message(get_host_digest_message(digest), key)
 
 def pack_datafile(signature, data):
     if len(signature) != 64:
@@ -78,15 +188,36 @@ def pack_datafile(signature, data):
 
     return binascii.hexlify(signature) + binascii.hexlify(data)
 
-def sign(key_pem, config_json, protospec):
-    compile_config()
+def prepare(config_json, protospec):
+    # Everything but signing, so it may run before the user confirms
     config = json.loads(config_json)
     proto = get_compiled_proto(protospec)
+    return compose_message(config, proto)
+
+def prepare_batch(config_jsons, protospec, check=None):
+    # check() is called before every config, it raises to stop early
+    items = []
+    for c in config_jsons:
+        if check is not None:
+            check()
+        items.append(prepare(c, protospec))
+    return items
+
+def sign_prepared(key, data):
+    signature = sign_message(data, key)
+    return pack_datafile(signature, data)
 
-    data = compose_message(config, proto)
-    signature = sign_message(data, key_pem)
+def sign(key, config_json, protospec):
+    data = prepare(config_json, protospec)
+    return sign_prepared(key, data)
 
-    return pack_datafile(signature, data)
+def sign_merkle(key, items):
+    # Single signature of Merkle root covers all composed messages,
+    # returns signed Merkle datafiles in order of items
+    levels = merkle.build_tree(items)
+    signature = sign_message(merkle.get_root(levels), key)
+
+    return [ merkle.pack_datafile(signature, i, len(items), merkle.get_proof(levels, i), items[i]) for i in range(len(items)) ]
 
 if __name__ == '__main__':
     key_pem = ''
@@ -99,13 +230,13 @@ if __name__ == '__main__':
         key_pem += inp + "\n"
 
     # key_pem = open('sample.key', 'r').read()
+    key = ecdsa.keys.SigningKey.from_pem(key_pem)
 
-    compile_config()
     json = parse_json('config.json')
     proto = get_compiled_proto(open('../../trezor-emu/protob/trezor.proto', 'r').read())
 
     data = compose_message(json, proto)
-    signature = sign_message(data, key_pem)
+    signature = sign_message(data, key)
 
     signed = pack_datafile(signature, data)
     fp = open('config_signed.bin', 'w')
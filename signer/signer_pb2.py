@@ -15,7 +15,7 @@ import google.protobuf.descriptor_pb2
 DESCRIPTOR = _descriptor.FileDescriptor(
   name='signer.proto',
   package='',
-  serialized_pb='\n\x0csigner.proto\x1a google/protobuf/descriptor.proto\"\x1a\n\x07Success\x12\x0f\n\x07message\x18\x01 \x01(\x0c\"6\n\x07\x46\x61ilure\x12\x1a\n\x04\x63ode\x18\x01 \x01(\x0e\x32\x0c.FailureType\x12\x0f\n\x07message\x18\x02 \x01(\x0c\"4\n\x0cSignFirmware\x12\x0c\n\x04slot\x18\x01 \x01(\r\x12\x16\n\x08\x66irmware\x18\x02 \x01(\x0c\x42\x04\x88\xb5\x18\x01\"5\n\x10SignPluginConfig\x12\x0e\n\x06\x63onfig\x18\x01 \x01(\x0c\x12\x11\n\tprotospec\x18\x02 \x01(\x0c\"%\n\x0cSignedObject\x12\x15\n\x07payload\x18\x01 \x01(\x0c\x42\x04\x88\xb5\x18\x01*\x9d\x01\n\x0bMessageType\x12\x17\n\x13MessageType_Success\x10\x01\x12\x17\n\x13MessageType_Failure\x10\x02\x12\x1c\n\x18MessageType_SignFirmware\x10\x03\x12 \n\x1cMessageType_SignPluginConfig\x10\x04\x12\x1c\n\x18MessageType_SignedObject\x10\x05*~\n\x0b\x46\x61ilureType\x12\x1d\n\x19\x46\x61ilure_UnexpectedMessage\x10\x01\x12\x1a\n\x16\x46\x61ilure_ButtonExpected\x10\x02\x12\x17\n\x13\x46\x61ilure_SyntaxError\x10\x03\x12\x1b\n\x17\x46\x61ilure_ActionCancelled\x10\x04:/\n\x06\x62inary\x12\x1d.google.protobuf.FieldOptions\x18\xd1\x86\x03 \x01(\x08')
+  serialized_pb='\n\x0csigner.proto\x1a google/protobuf/descriptor.proto\"\x1a\n\x07Success\x12\x0f\n\x07message\x18\x01 \x01(\x0c\"6\n\x07\x46\x61ilure\x12\x1a\n\x04\x63ode\x18\x01 \x01(\x0e\x32\x0c.FailureType\x12\x0f\n\x07message\x18\x02 \x01(\x0c\"R\n\x0cSignFirmware\x12\x0c\n\x04slot\x18\x01 \x01(\r\x12\x16\n\x08\x66irmware\x18\x02 \x01(\x0c\x42\x04\x88\xb5\x18\x01\x12\x0c\n\x04size\x18\x03 \x01(\r\x12\x0e\n\x06key_id\x18\x04 \x01(\x0c\"6\n\x14\x46irmwareChunkRequest\x12\x0e\n\x06offset\x18\x01 \x01(\r\x12\x0e\n\x06length\x18\x02 \x01(\r\"#\n\rFirmwareChunk\x12\x12\n\x04\x64\x61ta\x18\x01 \x01(\x0c\x42\x04\x88\xb5\x18\x01\"E\n\x10SignPluginConfig\x12\x0e\n\x06\x63onfig\x18\x01 \x01(\x0c\x12\x11\n\tprotospec\x18\x02 \x01(\x0c\x12\x0e\n\x06key_id\x18\x03 \x01(\x0c\"[\n\x15SignPluginConfigBatch\x12\x0f\n\x07\x63onfigs\x18\x01 \x03(\x0c\x12\x11\n\tprotospec\x18\x02 \x01(\x0c\x12\x0e\n\x06key_id\x18\x03 \x01(\x0c\x12\x0e\n\x06merkle\x18\x04 \x01(\x08\"G\n\nSignDigest\x12\x14\n\x06\x64igest\x18\x01 \x01(\x0c\x42\x04\x88\xb5\x18\x01\x12\x13\n\x0b\x64\x65scription\x18\x02 \x01(\x0c\x12\x0e\n\x06key_id\x18\x03 \x01(\x0c\"4\n\x0cSignedObject\x12\x15\n\x07payload\x18\x01 \x01(\x0c\x42\x04\x88\xb5\x18\x01\x12\r\n\x05index\x18\x02 \x01(\r*\xa5\x02\n\x0bMessageType\x12\x17\n\x13MessageType_Success\x10\x01\x12\x17\n\x13MessageType_Failure\x10\x02\x12\x1c\n\x18MessageType_SignFirmware\x10\x03\x12 \n\x1cMessageType_SignPluginConfig\x10\x04\x12\x1c\n\x18MessageType_SignedObject\x10\x05\x12%\n!MessageType_SignPluginConfigBatch\x10\x06\x12$\n MessageType_FirmwareChunkRequest\x10\x07\x12\x1d\n\x19MessageType_FirmwareChunk\x10\x08\x12\x1a\n\x16MessageType_SignDigest\x10\t*~\n\x0b\x46\x61ilureType\x12\x1d\n\x19\x46\x61ilure_UnexpectedMessage\x10\x01\x12\x1a\n\x16\x46\x61ilure_ButtonExpected\x10\x02\x12\x17\n\x13\x46\x61ilure_SyntaxError\x10\x03\x12\x1b\n\x17\x46\x61ilure_ActionCancelled\x10\x04:/\n\x06\x62inary\x12\x1d.google.protobuf.FieldOptions\x18\xd1\x86\x03 \x01(\x08')
 
 _MESSAGETYPE = _descriptor.EnumDescriptor(
   name='MessageType',
@@ -43,11 +43,27 @@ _MESSAGETYPE = _descriptor.EnumDescriptor(
       name='MessageType_SignedObject', index=4, number=5,
       options=None,
       type=None),
+    _descriptor.EnumValueDescriptor(
+      name='MessageType_SignPluginConfigBatch', index=5, number=6,
+      options=None,
+      type=None),
+    _descriptor.EnumValueDescriptor(
+      name='MessageType_FirmwareChunkRequest', index=6, number=7,
+      options=None,
+      type=None),
+    _descriptor.EnumValueDescriptor(
+      name='MessageType_FirmwareChunk', index=7, number=8,
+      options=None,
+      type=None),
+    _descriptor.EnumValueDescriptor(
+      name='MessageType_SignDigest', index=8, number=9,
+      options=None,
+      type=None),
   ],
   containing_type=None,
   options=None,
-  serialized_start=283,
-  serialized_end=440,
+  serialized_start=603,
+  serialized_end=896,
 )
 
 MessageType = enum_type_wrapper.EnumTypeWrapper(_MESSAGETYPE)
@@ -76,8 +92,8 @@ _FAILURETYPE = _descriptor.EnumDescriptor(
   ],
   containing_type=None,
   options=None,
-  serialized_start=442,
-  serialized_end=568,
+  serialized_start=898,
+  serialized_end=1024,
 )
 
 FailureType = enum_type_wrapper.EnumTypeWrapper(_FAILURETYPE)
@@ -86,6 +102,10 @@ MessageType_Failure = 2
 MessageType_SignFirmware = 3
 MessageType_SignPluginConfig = 4
 MessageType_SignedObject = 5
+MessageType_SignPluginConfigBatch = 6
+MessageType_FirmwareChunkRequest = 7
+MessageType_FirmwareChunk = 8
+MessageType_SignDigest = 9
 Failure_UnexpectedMessage = 1
 Failure_ButtonExpected = 2
 Failure_SyntaxError = 3
@@ -185,6 +205,20 @@ _SIGNFIRMWARE = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=_descriptor._ParseOptions(descriptor_pb2.FieldOptions(), '\210\265\030\001')),
+    _descriptor.FieldDescriptor(
+      name='size', full_name='SignFirmware.size', index=2,
+      number=3, type=13, cpp_type=3, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='key_id', full_name='SignFirmware.key_id', index=3,
+      number=4, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value="",
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
   ],
   extensions=[
   ],
@@ -195,7 +229,70 @@ _SIGNFIRMWARE = _descriptor.Descriptor(
   is_extendable=False,
   extension_ranges=[],
   serialized_start=134,
-  serialized_end=186,
+  serialized_end=216,
+)
+
+
+_FIRMWARECHUNKREQUEST = _descriptor.Descriptor(
+  name='FirmwareChunkRequest',
+  full_name='FirmwareChunkRequest',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='offset', full_name='FirmwareChunkRequest.offset', index=0,
+      number=1, type=13, cpp_type=3, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='length', full_name='FirmwareChunkRequest.length', index=1,
+      number=2, type=13, cpp_type=3, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  extension_ranges=[],
+  serialized_start=218,
+  serialized_end=272,
+)
+
+
+_FIRMWARECHUNK = _descriptor.Descriptor(
+  name='FirmwareChunk',
+  full_name='FirmwareChunk',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='data', full_name='FirmwareChunk.data', index=0,
+      number=1, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value="",
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=_descriptor._ParseOptions(descriptor_pb2.FieldOptions(), '\210\265\030\001')),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  extension_ranges=[],
+  serialized_start=274,
+  serialized_end=309,
 )
 
 
@@ -220,6 +317,13 @@ _SIGNPLUGINCONFIG = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
+    _descriptor.FieldDescriptor(
+      name='key_id', full_name='SignPluginConfig.key_id', index=2,
+      number=3, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value="",
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
   ],
   extensions=[
   ],
@@ -229,8 +333,99 @@ _SIGNPLUGINCONFIG = _descriptor.Descriptor(
   options=None,
   is_extendable=False,
   extension_ranges=[],
-  serialized_start=188,
-  serialized_end=241,
+  serialized_start=311,
+  serialized_end=380,
+)
+
+
+_SIGNPLUGINCONFIGBATCH = _descriptor.Descriptor(
+  name='SignPluginConfigBatch',
+  full_name='SignPluginConfigBatch',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='configs', full_name='SignPluginConfigBatch.configs', index=0,
+      number=1, type=12, cpp_type=9, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='protospec', full_name='SignPluginConfigBatch.protospec', index=1,
+      number=2, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value="",
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='key_id', full_name='SignPluginConfigBatch.key_id', index=2,
+      number=3, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value="",
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='merkle', full_name='SignPluginConfigBatch.merkle', index=3,
+      number=4, type=8, cpp_type=7, label=1,
+      has_default_value=False, default_value=False,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  extension_ranges=[],
+  serialized_start=382,
+  serialized_end=473,
+)
+
+
+_SIGNDIGEST = _descriptor.Descriptor(
+  name='SignDigest',
+  full_name='SignDigest',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='digest', full_name='SignDigest.digest', index=0,
+      number=1, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value="",
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=_descriptor._ParseOptions(descriptor_pb2.FieldOptions(), '\210\265\030\001')),
+    _descriptor.FieldDescriptor(
+      name='description', full_name='SignDigest.description', index=1,
+      number=2, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value="",
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='key_id', full_name='SignDigest.key_id', index=2,
+      number=3, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value="",
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  extension_ranges=[],
+  serialized_start=475,
+  serialized_end=546,
 )
 
 
@@ -248,6 +443,13 @@ _SIGNEDOBJECT = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=_descriptor._ParseOptions(descriptor_pb2.FieldOptions(), '\210\265\030\001')),
+    _descriptor.FieldDescriptor(
+      name='index', full_name='SignedObject.index', index=1,
+      number=2, type=13, cpp_type=3, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
   ],
   extensions=[
   ],
@@ -257,15 +459,19 @@ _SIGNEDOBJECT = _descriptor.Descriptor(
   options=None,
   is_extendable=False,
   extension_ranges=[],
-  serialized_start=243,
-  serialized_end=280,
+  serialized_start=548,
+  serialized_end=600,
 )
 
 _FAILURE.fields_by_name['code'].enum_type = _FAILURETYPE
 DESCRIPTOR.message_types_by_name['Success'] = _SUCCESS
 DESCRIPTOR.message_types_by_name['Failure'] = _FAILURE
 DESCRIPTOR.message_types_by_name['SignFirmware'] = _SIGNFIRMWARE
+DESCRIPTOR.message_types_by_name['FirmwareChunkRequest'] = _FIRMWARECHUNKREQUEST
+DESCRIPTOR.message_types_by_name['FirmwareChunk'] = _FIRMWARECHUNK
 DESCRIPTOR.message_types_by_name['SignPluginConfig'] = _SIGNPLUGINCONFIG
+DESCRIPTOR.message_types_by_name['SignPluginConfigBatch'] = _SIGNPLUGINCONFIGBATCH
+DESCRIPTOR.message_types_by_name['SignDigest'] = _SIGNDIGEST
 DESCRIPTOR.message_types_by_name['SignedObject'] = _SIGNEDOBJECT
 
 class Success(_message.Message):
@@ -286,12 +492,36 @@ class SignFirmware(_message.Message):
 
   # @@protoc_insertion_point(class_scope:SignFirmware)
 
+class FirmwareChunkRequest(_message.Message):
+  __metaclass__ = _reflection.GeneratedProtocolMessageType
+  DESCRIPTOR = _FIRMWARECHUNKREQUEST
+
+  # @@protoc_insertion_point(class_scope:FirmwareChunkRequest)
+
+class FirmwareChunk(_message.Message):
+  __metaclass__ = _reflection.GeneratedProtocolMessageType
+  DESCRIPTOR = _FIRMWARECHUNK
+
+  # @@protoc_insertion_point(class_scope:FirmwareChunk)
+
 class SignPluginConfig(_message.Message):
   __metaclass__ = _reflection.GeneratedProtocolMessageType
   DESCRIPTOR = _SIGNPLUGINCONFIG
 
   # @@protoc_insertion_point(class_scope:SignPluginConfig)
 
+class SignPluginConfigBatch(_message.Message):
+  __metaclass__ = _reflection.GeneratedProtocolMessageType
+  DESCRIPTOR = _SIGNPLUGINCONFIGBATCH
+
+  # @@protoc_insertion_point(class_scope:SignPluginConfigBatch)
+
+class SignDigest(_message.Message):
+  __metaclass__ = _reflection.GeneratedProtocolMessageType
+  DESCRIPTOR = _SIGNDIGEST
+
+  # @@protoc_insertion_point(class_scope:SignDigest)
+
 class SignedObject(_message.Message):
   __metaclass__ = _reflection.GeneratedProtocolMessageType
   DESCRIPTOR = _SIGNEDOBJECT
@@ -302,6 +532,10 @@ google.protobuf.descriptor_pb2.FieldOptions.RegisterExtension(binary)
 
 _SIGNFIRMWARE.fields_by_name['firmware'].has_options = True
 _SIGNFIRMWARE.fields_by_name['firmware']._options = _descriptor._ParseOptions(descriptor_pb2.FieldOptions(), '\210\265\030\001')
+_FIRMWARECHUNK.fields_by_name['data'].has_options = True
+_FIRMWARECHUNK.fields_by_name['data']._options = _descriptor._ParseOptions(descriptor_pb2.FieldOptions(), '\210\265\030\001')
+_SIGNDIGEST.fields_by_name['digest'].has_options = True
+_SIGNDIGEST.fields_by_name['digest']._options = _descriptor._ParseOptions(descriptor_pb2.FieldOptions(), '\210\265\030\001')
 _SIGNEDOBJECT.fields_by_name['payload'].has_options = True
 _SIGNEDOBJECT.fields_by_name['payload']._options = _descriptor._ParseOptions(descriptor_pb2.FieldOptions(), '\210\265\030\001')
 # @@protoc_insertion_point(module_scope)
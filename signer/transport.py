@@ -1,11 +1,166 @@
 import struct
 import mapping
+import signer_pb2 as proto
+
+MAGIC = '##'
+HEADER = struct.Struct(">HL")
+
+# Firmware is uploaded in chunks of this size, it bounds memory used by upload
+FIRMWARE_CHUNK_SIZE = 16 * 1024
+
+# Longest payload of any frame, longer frames are skipped without buffering them
+MAX_FRAME_LENGTH = 8 * 1024 * 1024
+
+# Message type -> longest payload of its frames, FirmwareChunk is the data
+# and a few bytes of field tag and length
+MAX_LENGTHS = {proto.MessageType_FirmwareChunk: FIRMWARE_CHUNK_SIZE + 8}
+
+
+class FrameTooLong(Exception):
+    pass
+
+
+class FrameDecoder(object):
+    '''Incremental decoder of the wire framing ("##", message type, length, payload).
+
+    Transports feed it with whatever bytes are available at the moment and pop
+    complete (msg_type, payload) frames. Partial frames are kept between calls,
+    so a frame split across several reads never blocks the caller.
+
+    Header announcing a payload over the limit of its message type raises
+    FrameTooLong, the payload is then dropped as it arrives.
+
+    Data live in a preallocated bytearray between start and end cursors.
+    Transports can read directly into it (reserve/commit), the buffer is only
+    compacted or grown when its tail runs out, so receiving an N-byte frame
+    costs O(N) and the payload is copied out just once.'''
+
+    def __init__(self, size=4096, max_lengths=None, max_length=MAX_FRAME_LENGTH):
+        self.size = size
+        self.max_lengths = max_lengths or {}
+        self.max_length = max_length
+        self.reset()
+
+    def reset(self):
+        self._set_buffer(bytearray(self.size))
+        self.start = 0  # First unprocessed byte
+        self.end = 0  # End of received data
+        self.header = None  # (msg_type, datalen) of the frame being received
+        self.skip = 0  # Bytes of rejected payload still to be dropped
+
+    def _set_buffer(self, buf):
+        self.buffer = buf
+        # Creating a memoryview costs as much as copying a whole report, keep one
+        self.view = memoryview(buf)
+
+    def reserve(self, length):
+        '''Return writable memoryview of length bytes after the received data.
+        Call commit() with number of bytes really written.'''
+        end = self.end
+        if end + length > len(self.buffer):
+            used = end - self.start
+            # Slicing the bytearray copies the data, the regions may overlap
+            data = self.buffer[self.start:end]
+            if used + length > len(self.buffer) / 2:
+                # Buffer is too small, double its size
+                self._set_buffer(bytearray(max(len(self.buffer) * 2, used + length)))
+
+            # Otherwise there is enough of free space, just move the data to the beginning
+            self.buffer[:used] = data
+            self.start = 0
+            self.end = end = used
+
+        return self.view[end:end + length]
+
+    def commit(self, length):
+        self.end += length
+
+    def feed(self, data):
+        length = len(data)
+        self.reserve(length)
+        self.buffer[self.end:self.end + length] = data
+        self.end += length
+
+    def pop(self):
+        '''Return next complete (msg_type, payload) frame or None'''
+        if self.skip:
+            length = min(self.skip, self.end - self.start)
+            self._consume(length)
+            self.skip -= length
+            if self.skip:
+                return None
+
+        if self.header is None and not self._parse_header():
+            return None
+
+        (msg_type, datalen) = self.header
+        if self.end - self.start < datalen:
+            # Payload didn't arrive completely yet
+            return None
+
+        payload = self.view[self.start:self.start + datalen].tobytes()
+        self._consume(datalen)
+        self.header = None
+        return (msg_type, payload)
+
+    def _consume(self, length):
+        self.start += length
+        if self.start == self.end:
+            # Buffer is empty, rewind for free
+            self.start = self.end = 0
+
+    def _parse_header(self):
+        # Align to the beginning of the header, skipping any garbage
+        # (like report padding) between frames
+        pos = self.buffer.find(MAGIC, self.start, self.end)
+        if pos == -1:
+            # Keep the last byte, it may be the first half of the magic
+            self._consume(max(0, self.end - self.start - 1))
+            return False
+
+        self._consume(pos - self.start)
+        if self.end - self.start < len(MAGIC) + HEADER.size:
+            return False
+
+        (msg_type, datalen) = HEADER.unpack_from(self.buffer, self.start + len(MAGIC))
+        self._consume(len(MAGIC) + HEADER.size)
+
+        limit = self.max_lengths.get(msg_type, self.max_length)
+        if datalen > limit:
+            self.skip = datalen
+            raise FrameTooLong("Frame of type %d has %d bytes, limit is %d" % (msg_type, datalen, limit))
+
+        self.header = (msg_type, datalen)
+        return True
+
+
+class FrameEncoder(object):
+    '''Builds outgoing frames in a reusable buffer.
+
+    Header is packed in place and the payload is copied just once,
+    transports get a memoryview of the frame and slice it without copying.'''
+
+    def __init__(self, size=4096):
+        self.buffer = bytearray(size)
+
+    def encode(self, msg_type, payload):
+        offset = len(MAGIC) + HEADER.size
+        length = offset + len(payload)
+        if length > len(self.buffer):
+            self.buffer = bytearray(max(len(self.buffer) * 2, length))
+
+        self.buffer[:len(MAGIC)] = MAGIC
+        HEADER.pack_into(self.buffer, len(MAGIC), msg_type, len(payload))
+        self.buffer[offset:length] = payload
+        return memoryview(self.buffer)[:length]
 
 
 class Transport(object):
     def __init__(self, device, *args, **kwargs):
         self.device = device
         self.session_depth = 0
+        self.decoder = FrameDecoder(max_lengths=MAX_LENGTHS)
+        self.encoder = FrameEncoder()
         self._open()
 
     def _open(self):
@@ -14,12 +169,23 @@ class Transport(object):
     def _close(self):
         raise NotImplemented
 
-    def _write(self, msg):
+    def _write(self, frame):
+        # Frame is a memoryview into the encoder's buffer,
+        # valid only until the next write
         raise NotImplemented
 
-    def _read(self):
+    def _read_chunk(self):
+        # Return bytes available on the wire (at least one if blocking)
+        # or None if nothing can be read
         raise NotImplemented
 
+    def _read_into(self, decoder):
+        # Transports able to read into a buffer override this
+        # to avoid the intermediate string
+        data = self._read_chunk()
+        if data:
+            decoder.feed(data)
+
     def _session_begin(self):
         pass
     
@@ -29,6 +195,11 @@ class Transport(object):
     def ready_to_read(self):
         raise NotImplemented
 
+    def fileno(self):
+        # Descriptor for waiting on incoming data in select(),
+        # None if the transport can be only polled
+        return None
+
     def session_begin(self):
         if self.session_depth == 0:
             self._session_begin()
@@ -42,62 +213,42 @@ class Transport(object):
 
     def close(self):
         self._close()
+        self.decoder.reset()
 
     def write(self, msg):
         ser = msg.SerializeToString()
-        header = struct.pack(">HL", mapping.get_type(msg), len(ser))
-        self._write("##%s%s" % (header, ser))
+        self._write(self.encoder.encode(mapping.get_type(msg), ser))
 
     def read(self):
-        if not self.ready_to_read():
-            return None
+        # Frame may be already decoded from previous chunk
+        data = self.decoder.pop()
 
-        data = self._read()
         if data is None:
-            return None
+            if not self.ready_to_read():
+                return None
+
+            data = self._read()
+            if data is None:
+                return None
 
         return self._parse_message(data)
 
     def read_blocking(self):
         while True:
-            data = self._read()
+            data = self.decoder.pop()
+            if data is None:
+                data = self._read()
             if data is not None:
                 break
 
         return self._parse_message(data)
 
+    def _read(self):
+        self._read_into(self.decoder)
+        return self.decoder.pop()
+
     def _parse_message(self, data):
         (msg_type, data) = data
         inst = mapping.get_class(msg_type)()
         inst.ParseFromString(data)
         return inst
-
-    def _read_headers(self, read_f):
-        # Try to read headers until some sane value are detected
-        is_ok = False
-        while not is_ok:
-
-            # Align cursor to the beginning of the header ("##")
-            c = read_f.read(1)
-            i = 0
-            while c != '#':
-                i += 1
-                if i >= 64:
-                    # timeout
-                    raise Exception("Timed out while waiting for the magic character")
-                # print "Aligning to magic characters"
-                c = read_f.read(1)
-
-            if read_f.read(1) != "#":
-                # Second character must be # to be valid header
-                raise Exception("Second magic character is broken")
-
-            # Now we're most likely on the beginning of the header
-            try:
-                headerlen = struct.calcsize(">HL")
-                (msg_type, datalen) = struct.unpack(">HL", read_f.read(headerlen))
-                break
-            except:
-                raise Exception("Cannot parse header length")
-
-        return (msg_type, datalen)
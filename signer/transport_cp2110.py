@@ -7,26 +7,16 @@ import time
 from select import select
 from transport import Transport
 
-class FakeRead(object):
-    # Let's pretend we have a file-like interface
-    def __init__(self, func):
-        self.func = func
-        
-    def read(self, size):
-        return self.func(size)
-
 class Cp2110Transport(Transport):
     def __init__(self, device, *args, **kwargs):
         self.serial = None
-        self.buffer = ''
+        self.report = bytearray(63)
         super(Cp2110Transport, self).__init__(device, *args, **kwargs)
 
     def _open(self):
-        self.buffer = ''
         self.serial = serial.Serial(self.device, 115200, timeout=10, writeTimeout=10)
 
     def _close(self):
-        self.buffer = ''
         self.serial.close()
         self.serial = None
 
@@ -34,11 +24,18 @@ class Cp2110Transport(Transport):
         rlist, _, _ = select([self.serial], [], [], 0)
         return len(rlist) > 0
 
-    def _write(self, msg):
+    def fileno(self):
+        return self.serial.fileno()
+
+    def _write(self, frame):
         try:
-            while len(msg):
-                self.serial.write(msg[:63] + '0'*(63-len(msg[:63])))
-                msg = msg[63:]
+            report = self.report
+            for i in range(0, len(frame), 63):
+                chunk = frame[i:i + 63]
+                report[:len(chunk)] = chunk
+                # Pad the last report
+                report[len(chunk):] = '0' * (63 - len(chunk))
+                self.serial.write(report)
 
             self.serial.flush()
 
@@ -46,25 +43,19 @@ class Cp2110Transport(Transport):
             print "Error while writing to socket"
             raise
 
-    def _read(self):
+    def _read_into(self, decoder):
+        # Read the report directly into decoder's buffer
+        view = decoder.reserve(63)
         try:
-            (msg_type, datalen) = self._read_headers(FakeRead(self._raw_read))
-            return (msg_type, self._raw_read(datalen))
+            length = self.serial.readinto(view)
+            # print "READ", [ ord(x) for x in view[:length].tobytes() ]
         except serial.SerialException:
             print "Failed to read from device"
             raise
 
-    def _raw_read(self, length): 
-        while len(self.buffer) < length:
-            data = self.serial.read(63)
-            # print "READ", [ ord(x) for x in data ]
-            
-            if len(data) != 63:
-                # Force to use 63-byte messages
-                raise Exception("Payload must have exactly 63 bytes")
-                         
-            self.buffer += data
+        if length != 63:
+            # Force to use 63-byte messages
+            raise Exception("Payload must have exactly 63 bytes")
 
-        ret = self.buffer[:length]
-        self.buffer = self.buffer[length:]
-        return ret
+        # Padding of the report is skipped by the frame decoder
+        decoder.commit(length)
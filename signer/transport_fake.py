@@ -18,7 +18,7 @@ class FakeTransport(Transport):
     def ready_to_read(self):
         return False
 
-    def _write(self, msg):
+    def _write(self, frame):
         pass
 
     def _read(self):
@@ -2,25 +2,17 @@
 
 import hid
 import time
-from transport import Transport, NotImplementedException
+from transport import Transport
 
 DEVICE_IDS = [
     (0x10c4, 0xea80),  # Shield
     (0x534c, 0x0001),  # Trezor
 ]
 
-class FakeRead(object):
-    # Let's pretend we have a file-like interface
-    def __init__(self, func):
-        self.func = func
-        
-    def read(self, size):
-        return self.func(size)
-    
 class HidTransport(Transport):
     def __init__(self, device, *args, **kwargs):
         self.hid = None
-        self.buffer = ''
+        self.report = bytearray(64)
         if bool(kwargs.get('debug_link')):
             device = device[:-2] + '01'
         super(HidTransport, self).__init__(device, *args, **kwargs)
@@ -39,7 +31,6 @@ class HidTransport(Transport):
         return devices
         
     def _open(self):
-        self.buffer = ''
         print self.device
         self.hid = hid.device()
         self.hid.open_path(self.device)
@@ -49,39 +40,34 @@ class HidTransport(Transport):
     
     def _close(self):
         self.hid.close()
-        self.buffer = ''
         self.hid = None
     
     def ready_to_read(self):
         return False
     
-    def _write(self, msg):
-        msg = bytearray(msg)
-        while len(msg):            
+    def _write(self, frame):
+        report = self.report
+        report[0] = 63
+        for i in range(0, len(frame), 63):
             # Report ID, data padded to 63 bytes
-            self.hid.write([63, ] + list(msg[:63]) + [0] * (63 - len(msg[:63])))
-            msg = msg[63:]
+            chunk = frame[i:i + 63]
+            report[1:len(chunk) + 1] = chunk
+            report[len(chunk) + 1:] = '\0' * (63 - len(chunk))
+            self.hid.write(report)
             
-    def _read(self):
-        (msg_type, datalen) = self._read_headers(FakeRead(self._raw_read))
-        return (msg_type, self._raw_read(datalen))
-                    
-    def _raw_read(self, length):        
-        while len(self.buffer) < length:
-            data = self.hid.read(64)
-            if not len(data):
-                time.sleep(0.05)
-                continue
+    def _read_into(self, decoder):
+        data = self.hid.read(64)
+        if not len(data):
+            time.sleep(0.05)
+            return
 
-            report_id = data[0]
-            
-            if report_id > 63:
-                # Command report
-                raise Exception("Not implemented")
-                                     
-            # Payload received, skip the report ID
-            self.buffer += str(bytearray(data[1:]))
+        report_id = data[0]
+
+        if report_id > 63:
+            # Command report
+            raise Exception("Not implemented")
 
-        ret = self.buffer[:length]
-        self.buffer = self.buffer[length:]
-        return ret
+        # Payload received, skip the report ID
+        length = len(data) - 1
+        decoder.reserve(length)[:] = bytearray(data[1:])
+        decoder.commit(length)
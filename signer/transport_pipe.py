@@ -43,18 +43,22 @@ class PipeTransport(Transport):
         rlist, _, _ = select([self.read_f], [], [], 0)
         return len(rlist) > 0
 
-    def _write(self, msg):
+    def fileno(self):
+        return self.read_fd
+
+    def _write(self, frame):
         try:
-            self.write_f.write(msg)
-            self.write_f.flush()
+            # Bypass buffering of write_f, pipe may accept only part of the frame
+            while len(frame):
+                frame = frame[os.write(self.write_fd, frame):]
         except OSError:
             print "Error while writing to socket"
             raise
 
-    def _read(self):
+    def _read_chunk(self):
         try:
-            (msg_type, datalen) = self._read_headers(self.read_f)
-            return (msg_type, self.read_f.read(datalen))
-        except IOError:
+            # Bypass buffering of read_f, os.read returns whatever is in the pipe
+            return os.read(self.read_fd, 4096)
+        except OSError:
             print "Failed to read from device"
             raise
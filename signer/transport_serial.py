@@ -23,18 +23,27 @@ class SerialTransport(Transport):
         rlist, _, _ = select([self.serial], [], [], 0)
         return len(rlist) > 0
 
-    def _write(self, msg):
+    def fileno(self):
+        return self.serial.fileno()
+
+    def _write(self, frame):
         try:
-            self.serial.write(msg)
+            self.serial.write(frame)
             self.serial.flush()
         except serial.SerialException:
             print "Error while writing to socket"
             raise
 
-    def _read(self):
+    def _read_chunk(self):
         try:
-            (msg_type, datalen) = self._read_headers(self.serial)
-            return (msg_type, self.serial.read(datalen))
+            # Take everything waiting in the driver, block for at least one byte
+            data = self.serial.read(max(1, self.serial.inWaiting()))
         except serial.SerialException:
             print "Failed to read from device"
             raise
+
+        if not data:
+            # Read timeout, read_blocking() would wait forever
+            raise Exception("Timed out while reading from device")
+
+        return data
@@ -5,16 +5,6 @@ from select import select
 from transport import Transport
 
 
-class FakeRead(object):
-    # Because socket is the only transport which don't implement read()
-
-    def __init__(self, socket):
-        self.socket = socket
-
-    def read(self, size):
-        return self.socket.recv(size)
-
-
 class SocketTransportClient(Transport):
     def __init__(self, device, *args, **kwargs):
         device = device.split(':')
@@ -40,16 +30,24 @@ class SocketTransportClient(Transport):
         rlist, _, _ = select([self.socket], [], [], 0)
         return len(rlist) > 0
 
-    def _write(self, msg):
-        self.socket.sendall(msg)
+    def fileno(self):
+        return self.socket.fileno()
 
-    def _read(self):
+    def _write(self, frame):
+        self.socket.sendall(frame)
+
+    def _read_chunk(self):
         try:
-            (msg_type, datalen) = self._read_headers(self.filelike)
-            return (msg_type, self.filelike.read(datalen))
+            data = self.socket.recv(4096)
         except socket.error:
             print "Failed to read from device"
-            return None
+            raise
+
+        if not data:
+            # Nothing more will come, read_blocking() would wait forever
+            raise Exception("Device closed the connection")
+
+        return data
 
 
 class SocketTransport(Transport):
@@ -80,6 +78,7 @@ class SocketTransport(Transport):
             self.client.close()
             self.client = None
             self.filelike = None
+            self.decoder.reset()
 
     def _close(self):
         self._disconnect_client()
@@ -97,26 +96,38 @@ class SocketTransport(Transport):
             if len(rlist) > 0:
                 (self.client, ipaddr) = self.socket.accept()
                 print "Connected", ipaddr[0]
-                self.filelike = self.client.makefile()  # FakeRead(self.client)  # self.client.makefile()
+                self.filelike = self.client.makefile()
                 return self.ready_to_read()
             return False
 
-    def _write(self, msg):
+    def fileno(self):
+        # Listening socket becomes readable on incoming connection,
+        # which is accepted in ready_to_read()
+        if self.client:
+            return self.client.fileno()
+        return self.socket.fileno()
+
+    def _write(self, frame):
         if self.filelike:
             # None on disconnected client
 
             try:
-                self.filelike.write(msg)
-                self.filelike.flush()
+                self.client.sendall(frame)
             except socket.error:
                 print "Socket error"
                 self._disconnect_client()
 
-    def _read(self):
+    def _read_chunk(self):
         try:
-            (msg_type, datalen) = self._read_headers(self.filelike)
-            return msg_type, self.filelike.read(datalen)
+            data = self.client.recv(4096)
         except Exception:
             print "Failed to read from device"
             self._disconnect_client()
             return None
+
+        if not data:
+            # Client closed the connection
+            self._disconnect_client()
+            return None
+
+        return data
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules of signer import each other without the package name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'signer'))
@@ -0,0 +1,38 @@
+'''Signatures per second of every available signing backend.
+
+  python -m tests.benchmark_backends [seconds per backend] [message size]
+'''
+
+import sys
+import time
+
+import ecdsa
+import sign_backend
+
+CURVES = (ecdsa.SECP256k1, ecdsa.NIST256p)
+
+
+def measure(backend, key, data, seconds):
+    count = 0
+    start = time.time()
+    while time.time() - start < seconds:
+        backend.sign(key, data)
+        count += 1
+    return count / (time.time() - start)
+
+
+def main(seconds=2.0, size=300):
+    data = 'x' * size
+    for curve in CURVES:
+        key = ecdsa.SigningKey.from_secret_exponent(0x1234567, curve=curve)
+        for cls in sign_backend.BACKENDS:
+            try:
+                backend = cls()
+            except ImportError:
+                print "%-10s %-8s not available" % (curve.name, cls.name)
+                continue
+            print "%-10s %-8s %8.1f sig/s" % (curve.name, backend.name, measure(backend, key, data, seconds))
+
+
+if __name__ == '__main__':
+    main(*[float(arg) for arg in sys.argv[1:2]] + [int(arg) for arg in sys.argv[2:3]])
@@ -0,0 +1,47 @@
+'''Time of one call of every drawing primitive on 128x64 buffer.
+
+  python -m tests.benchmark_display_buffer [seconds per measurement]
+
+"pixels" is the buffer drawing pixel by pixel (tests/pixel_buffer.py),
+"pages" is DisplayBuffer working on whole page bytes. Repeated strings and
+bitmaps come from its caches, like when layout redraws the same screen.'''
+
+import sys
+import time
+
+import smallfonts
+from logo import logo
+from display_buffer import DisplayBuffer
+from pixel_buffer import PixelBuffer
+
+# Name -> function drawing on the buffer, arguments as layout.py uses them
+PRIMITIVES = [
+    ('rect clear', lambda buf: buf.clear(0, 0, 127, 63)),
+    ('invert', lambda buf: buf.invert(0, 44, 127, 63)),
+    ('box', lambda buf: buf.box(10, 20, 117, 40)),
+    ('frame', lambda buf: buf.frame(0, 0, 127, 63)),
+    ('clear', lambda buf: buf.clear()),
+    ('pixel', lambda buf: buf.draw_pixel(64, 32)),
+    ('string', lambda buf: buf.draw_string(0, 9, 'Sign config? 20480 B', smallfonts.Font5x8)),
+    ('bitmap', lambda buf: buf.draw_bitmap(logo)),
+]
+
+
+def measure(func, buf, seconds):
+    count = 0
+    start = time.time()
+    while time.time() - start < seconds:
+        func(buf)
+        count += 1
+    return (time.time() - start) / count
+
+
+def main(seconds=0.5):
+    print "%-12s %12s %12s" % ('primitive', 'pixels', 'pages')
+    for (name, func) in PRIMITIVES:
+        times = [measure(func, buf, seconds) for buf in (PixelBuffer(128, 64), DisplayBuffer(128, 64))]
+        print "%-12s %9.1f us %9.1f us" % ((name, ) + tuple(t * 1000000 for t in times))
+
+
+if __name__ == '__main__':
+    main(*[float(arg) for arg in sys.argv[1:2]])
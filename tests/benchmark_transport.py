@@ -0,0 +1,84 @@
+'''Time of receiving one frame in 63-byte reports (Cp2110Transport, HidTransport).
+
+  python -m tests.benchmark_transport [seconds per measurement]
+
+"str buffer" is the receiving code before FrameDecoder: reports appended
+to a string, header aligned by one-byte reads and the payload sliced off.'''
+
+import sys
+import time
+import struct
+
+from transport import FrameDecoder, MAGIC, HEADER
+
+SIZES = (1024, 64 * 1024, 1024 * 1024)
+REPORT = 63
+
+
+def get_reports(size):
+    frame = MAGIC + HEADER.pack(1, size) + 'x' * size
+    # Last report is padded like on the wire
+    frame += '\x00' * (-len(frame) % REPORT)
+    return [frame[i:i + REPORT] for i in range(0, len(frame), REPORT)]
+
+
+class StrBuffer(object):
+    def __init__(self, reports):
+        self.reports = iter(reports)
+        self.buffer = ''
+
+    def _raw_read(self, length):
+        while len(self.buffer) < length:
+            self.buffer += str(bytearray(next(self.reports)))
+
+        ret = self.buffer[:length]
+        self.buffer = self.buffer[length:]
+        return ret
+
+    def read(self):
+        while self._raw_read(1) != '#':
+            pass
+        self._raw_read(1)
+        (msg_type, datalen) = struct.unpack('>HL', self._raw_read(HEADER.size))
+        return (msg_type, self._raw_read(datalen))
+
+
+def receive_str(reports):
+    return StrBuffer(reports).read()
+
+
+def receive_decoder(reports, decoder=None):
+    decoder = decoder or FrameDecoder()
+    for report in reports:
+        # What Cp2110Transport.read() does for every report
+        decoder.reserve(REPORT)[:] = report
+        decoder.commit(REPORT)
+        frame = decoder.pop()
+        if frame is not None:
+            return frame
+
+
+def measure(func, reports, seconds):
+    count = 0
+    start = time.time()
+    while time.time() - start < seconds:
+        func(reports)
+        count += 1
+    return (time.time() - start) / count
+
+
+def main(seconds=1.0):
+    # Transport keeps its decoder, later frames reuse the grown buffer
+    decoder = FrameDecoder()
+
+    print "%8s %16s %16s %16s" % ('frame', 'str buffer', 'FrameDecoder', 'reused decoder')
+    for size in SIZES:
+        reports = get_reports(size)
+        assert receive_str(reports) == receive_decoder(reports) == receive_decoder(reports, decoder)
+        times = [measure(func, reports, seconds) for func in
+                 (receive_str, receive_decoder, lambda r: receive_decoder(r, decoder))]
+        print "%6d KB %13.3f ms %13.3f ms %13.3f ms" % ((size / 1024, ) + tuple(t * 1000 for t in times))
+
+
+if __name__ == '__main__':
+    main(*[float(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,14 @@
+#!/bin/bash
+# Descriptors compiled by protoc, tests/test_protoparser.py expects the same bytes from signer/protoparser.py
+
+cd `dirname $0`
+
+mkdir -p protob
+protoc -I/usr/include -I../../../protob signer.proto -oprotob/signer.bin
+protoc -I/usr/include -I../../../protob config.proto -oprotob/config.bin
+
+for dir in trezor-r0.10.0 trezor-r0.10.2 misc; do
+    for proto in $dir/*.proto; do
+        protoc -I/usr/include -I$dir `basename $proto` -o${proto%.proto}.bin
+    done
+done
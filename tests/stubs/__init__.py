@@ -0,0 +1 @@
+'''Stand-ins for the Raspberry Pi modules, tests put this directory on sys.path'''
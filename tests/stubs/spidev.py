@@ -0,0 +1,76 @@
+'''Stand-in for spidev emulating RAM of SSD1306 in horizontal addressing mode'''
+
+import RPi.GPIO as GPIO
+
+# Pin selecting data (high) or command (low)
+PIN_DC = 23
+
+# Number of argument bytes of the commands sent by display_spi
+ARGS = {0x20: 1, 0x21: 2, 0x22: 2, 0x81: 1, 0x8D: 1, 0xA8: 1, 0xD3: 1, 0xD5: 1, 0xD9: 1, 0xDA: 1, 0xDB: 1}
+
+# Default buffer size of spidev kernel driver
+MAX_TRANSFER = 4096
+
+
+class OldSpiDev(object):
+    '''spidev older than 3.4, without writebytes2()'''
+
+    def __init__(self, width=128, pages=8):
+        self.width = width
+        self.ram = bytearray(width * pages)
+        self.window = [0, width - 1, 0, pages - 1]  # Column and page address window
+        self.column = 0
+        self.page = 0
+        self.command = []  # Command waiting for its arguments
+        self.data_bytes = 0
+        self.command_bytes = 0
+        self.transfers = 0
+
+    def open(self, bus, device):
+        pass
+
+    def _write(self, data):
+        self.transfers += 1
+        data = bytearray(data)
+        if GPIO.pins.get(PIN_DC):
+            self.data_bytes += len(data)
+            for b in data:
+                self._write_ram(b)
+        else:
+            self.command_bytes += len(data)
+            for b in data:
+                self._write_command(b)
+
+    def _write_ram(self, b):
+        self.ram[self.page * self.width + self.column] = b
+        self.column += 1
+        if self.column > self.window[1]:
+            self.column = self.window[0]
+            self.page += 1
+            if self.page > self.window[3]:
+                self.page = self.window[2]
+
+    def _write_command(self, b):
+        self.command.append(b)
+        if len(self.command) <= ARGS.get(self.command[0], 0):
+            return
+
+        command = self.command
+        self.command = []
+        if command[0] == 0x21:
+            self.window[0:2] = command[1:3]
+            self.column = command[1]
+        elif command[0] == 0x22:
+            self.window[2:4] = command[1:3]
+            self.page = command[1]
+
+    def xfer2(self, data):
+        if len(data) > MAX_TRANSFER:
+            raise Exception("Transfer of %d bytes is over the limit" % len(data))
+        self._write(data)
+        return list(data)
+
+
+class SpiDev(OldSpiDev):
+    def writebytes2(self, data):
+        self._write(data)
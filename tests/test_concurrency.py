@@ -0,0 +1,158 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import unittest
+from distutils.spawn import find_executable
+
+import ecdsa
+import sign_plugin
+import sign_backend
+from proto_cache import ProtoCache, get_key
+
+# Concurrent signings of every test
+SIGNINGS = 32
+
+# Distinct protospecs, so threads both hit and fill the cache
+SPECS = 8
+
+SPEC = '''syntax = "proto2";
+
+package test%d;
+
+enum MessageType%d {
+    MessageType_Initialize = 0;
+    MessageType_Success = 2;
+}
+
+message Initialize {
+    optional string language = 1 [default='english'];
+    repeated uint32 address_n = 2;
+    optional bytes session_id_%d = 3;
+}
+'''
+
+
+class FixedTime(object):
+    '''valid_until of composed configs must not depend on when the thread ran'''
+    @staticmethod
+    def time():
+        return 1500000000
+
+
+def run_threads(func, count):
+    results = [None] * count
+    errors = []
+
+    def worker(i):
+        try:
+            results[i] = func(i)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise errors[0]
+    return results
+
+
+class TestConcurrentSigning(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='trezor-signer-test-')
+        self.saved = (sign_plugin.proto_cache, sign_plugin.TREZOR_PROTO_DIR, sign_plugin.time,
+                      sign_plugin.backend, sign_plugin._compile_proto)
+        sign_plugin.TREZOR_PROTO_DIR = self.tmp
+        sign_plugin.time = FixedTime
+
+        self.key = ecdsa.SigningKey.from_secret_exponent(0x1234567, curve=ecdsa.SECP256k1)
+        self.specs = [SPEC % (i, i, i) for i in range(SPECS)]
+        self.configs = [json.dumps({
+            'valid_days': 1 + i,
+            'whitelist_urls': ['https://example.com/%d' % i],
+            'blacklist_urls': [],
+            'known_devices': [['0x534c', '0x%04x' % i]],
+        }) for i in range(SIGNINGS)]
+
+        # Serial baseline with a cache of its own
+        self.use_cache('baseline')
+        self.baseline = [self.sign(i) for i in range(SIGNINGS)]
+
+    def tearDown(self):
+        (sign_plugin.proto_cache, sign_plugin.TREZOR_PROTO_DIR, sign_plugin.time,
+         sign_plugin.backend, sign_plugin._compile_proto) = self.saved
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def use_cache(self, name, max_memory_size=4 * 1024 * 1024):
+        sign_plugin.proto_cache = ProtoCache(os.path.join(self.tmp, name), max_memory_size=max_memory_size)
+
+    def sign(self, i):
+        return sign_plugin.sign(self.key, self.configs[i], self.specs[i % SPECS])
+
+    def check_threads(self):
+        self.assertEqual(run_threads(self.sign, SIGNINGS), self.baseline)
+
+    def test_threads(self):
+        for name in ('ecdsa', 'openssl'):
+            try:
+                sign_plugin.backend = sign_backend.get_backend(name)
+            except ImportError:
+                continue
+
+            self.use_cache('threads-' + name)
+            self.check_threads()
+
+    def test_threads_memory_eviction(self):
+        # Memory part holds about one entry, threads keep evicting each other's
+        self.use_cache('eviction', max_memory_size=1)
+        self.check_threads()
+
+    def test_threads_protoc(self):
+        if not find_executable('protoc'):
+            self.skipTest("protoc is not installed")
+
+        sign_plugin._compile_proto = sign_plugin._run_protoc
+        self.use_cache('protoc')
+        self.check_threads()
+
+        # Every protoc run cleans up its own directory
+        self.assertEqual(sorted(os.listdir(self.tmp)), ['baseline', 'protoc'])
+
+
+class TestProtoCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='trezor-signer-test-')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_shared_cache(self):
+        # Small limits, so eviction runs all the time in both parts
+        cache = ProtoCache(self.tmp, max_disk_size=64 * 1024, max_memory_size=16 * 1024)
+        blobs = [hashlib.sha256(str(i)).digest() * (32 * (1 + i % 4)) for i in range(64)]
+        keys = [get_key(blob) for blob in blobs]
+
+        def worker(n):
+            for step in range(200):
+                i = (n * 7 + step) % len(blobs)
+                data = cache.get(keys[i])
+                if data is None:
+                    cache.put(keys[i], blobs[i])
+                else:
+                    self.assertEqual(data, blobs[i])
+            return True
+
+        self.assertEqual(run_threads(worker, SIGNINGS), [True] * SIGNINGS)
+        self.assertEqual(cache.memory_size, sum(len(data) for data in cache.memory.values()))
+        self.assertTrue(cache.memory_size <= 16 * 1024)
+        self.assertFalse([name for name in os.listdir(self.tmp) if name.startswith('.')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import random
+import unittest
+
+import smallfonts
+from logo import logo
+from display_buffer import DisplayBuffer
+from pixel_buffer import PixelBuffer
+
+OPERATIONS = ['clear', 'clear_all', 'invert', 'box', 'frame', 'pixel', 'clear_pixel', 'char', 'string', 'bitmap']
+
+
+def run(buffers, rand, count):
+    '''Apply the same random operations to all buffers'''
+    for step in range(count):
+        operation = rand.choice(OPERATIONS)
+        if operation == 'bitmap' and rand.random() < 0.9:
+            # Slow in the old buffer, a few of them are enough
+            operation = 'pixel'
+        args = (rand.randint(-10, 140), rand.randint(-10, 75), rand.randint(-10, 140), rand.randint(-10, 75))
+        font = rand.choice([smallfonts.Font5x8, smallfonts.Font7x8])
+        text = ''.join(chr(rand.randint(1, 200)) for _ in range(rand.randint(0, 25)))
+        for buf in buffers:
+            if operation == 'clear':
+                buf.clear(*args)
+            elif operation == 'clear_all':
+                buf.clear()
+            elif operation == 'invert':
+                # Old buffer wrapped negative coordinates around the list
+                buf.invert(*[max(0, v) for v in args])
+            elif operation == 'pixel':
+                buf.draw_pixel(args[0], args[1])
+            elif operation == 'clear_pixel':
+                buf.clear_pixel(args[0], args[1])
+            elif operation == 'char':
+                buf.draw_char(args[0], args[1], ord(text[:1] or ' '), font)
+            elif operation == 'string':
+                buf.draw_string(args[0], args[1], text, font)
+            elif operation == 'bitmap':
+                buf.draw_bitmap(logo)
+            else:
+                getattr(buf, operation)(*args)
+
+
+class TestPixelIdentical(unittest.TestCase):
+    def test_random(self):
+        rand = random.Random(18)
+        for sequence in range(300):
+            buf = DisplayBuffer(128, 64)
+            reference = PixelBuffer(128, 64)
+            run([buf, reference], rand, 40)
+            self.assertEqual(list(buf.data), reference.data, sequence)
+
+            x = rand.randint(-2, 130)
+            y = rand.randint(-2, 66)
+            self.assertEqual(buf.get_pixel(x, y), reference.get_pixel(x, y))
+
+    def test_dirty(self):
+        # Everything outside of the dirty windows is as it was at set_clean()
+        rand = random.Random(19)
+        buf = DisplayBuffer(128, 64)
+        for step in range(300):
+            before = bytearray(buf.data)
+            buf.set_clean()
+            run([buf], rand, rand.randint(1, 3))
+
+            covered = bytearray(len(buf.data))
+            for (x1, page1, x2, page2) in buf.get_dirty():
+                for page in range(page1, page2 + 1):
+                    covered[page * 128 + x1:page * 128 + x2 + 1] = '\x01' * (x2 - x1 + 1)
+            for i in range(len(buf.data)):
+                if not covered[i]:
+                    self.assertEqual(buf.data[i], before[i], (step, i))
+
+
+if __name__ == '__main__':
+    unittest.main()
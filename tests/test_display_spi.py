@@ -0,0 +1,101 @@
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs'))
+
+import spidev
+import smallfonts
+from logo import logo
+from display import Display
+from layout import Layout
+from display_buffer import DisplayBuffer
+
+
+def expected_ram(buffer):
+    '''Display RAM showing the buffer rotated by 180 degrees'''
+    return bytearray(int('{:08b}'.format(b)[::-1], 2) for b in reversed(buffer.data))
+
+
+class TestSPIDisplay(unittest.TestCase):
+    def setUp(self):
+        self.buffer = DisplayBuffer(128, 64)
+        self.display = Display(self.buffer, spi=True, virtual=False)
+        self.display.init()
+        self.spi = self.display.spi.spidev
+        self.layout = Layout(self.buffer)
+
+    def refresh(self):
+        '''Refresh the display, check its RAM and return number of data bytes sent'''
+        sent = self.spi.data_bytes
+        self.display.refresh()
+        self.assertEqual(self.spi.ram, expected_ram(self.buffer))
+        return self.spi.data_bytes - sent
+
+    def test_init_sends_full_frame(self):
+        self.assertEqual(self.spi.data_bytes, 1024)
+        self.assertEqual(self.spi.ram, expected_ram(self.buffer))
+
+    def test_screens(self):
+        self.layout.show_logo(None, 'LABEL')
+        self.assertEqual(self.refresh(), 1024)
+        self.layout.show_question(['a b c', 'second line'], 'Sign?', 'Confirm }', '{ Cancel')
+        self.assertEqual(self.refresh(), 1024)
+        self.layout.show_progress(10, 100, True)
+        self.assertEqual(self.refresh(), 1024)
+
+        # Next step changes only the bar
+        self.layout.show_progress(11, 100)
+        self.assertEqual(self.refresh(), 14)
+
+        # Nothing changed, nothing sent
+        self.assertEqual(self.refresh(), 0)
+
+    def test_scroll(self):
+        self.layout.show_receiving_address('1BitcoinEaterAddressDontSendf59kuE-and-some-more-text-to-scroll')
+        self.refresh()
+
+        sent = []
+        for i in range(80):
+            self.layout.last_update = 0
+            self.layout.update()
+            sent.append(self.refresh())
+
+        # Scrolled line is two pages of the whole width, not a full frame
+        self.assertEqual(max(sent), 256)
+
+    def test_random_drawing(self):
+        rand = random.Random(5)
+        for step in range(1000):
+            operation = rand.choice(['clear', 'invert', 'box', 'frame', 'pixel', 'clear_pixel',
+                                     'string', 'bitmap', 'clear_all'])
+            args = (rand.randint(-5, 132), rand.randint(-5, 68), rand.randint(-5, 132), rand.randint(-5, 68))
+            if operation == 'pixel':
+                self.buffer.draw_pixel(args[0], args[1])
+            elif operation == 'clear_pixel':
+                self.buffer.clear_pixel(args[0], args[1])
+            elif operation == 'string':
+                self.buffer.draw_string(args[0], args[1], 'Hello %d' % step, smallfonts.Font5x8)
+            elif operation == 'bitmap':
+                if rand.random() < 0.05:
+                    self.buffer.draw_bitmap(logo)
+            elif operation == 'clear_all':
+                if rand.random() < 0.05:
+                    self.buffer.clear()
+            elif operation == 'invert':
+                self.buffer.invert(*[max(0, x) for x in args])
+            else:
+                getattr(self.buffer, operation)(*args)
+            self.refresh()
+
+    def test_old_spidev(self):
+        # Without writebytes2() data go in chunks of at most spidev.MAX_TRANSFER bytes
+        self.display.spi.spidev = self.spi = spidev.OldSpiDev()
+        self.display.spi.full = True
+        self.layout.show_logo(None, 'LABEL')
+        self.assertEqual(self.refresh(), 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import ecdsa
+from keyring import Keyring, get_key_id
+
+
+def get_key(secret):
+    return ecdsa.SigningKey.from_secret_exponent(secret, curve=ecdsa.SECP256k1)
+
+
+class TestReload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='trezor-signer-test-')
+        self.path = os.path.join(self.tmp, 'keys.pem')
+        self.other = os.path.join(self.tmp, 'other.pem')
+        self.mtime = 1000000000
+
+        self.saved = sys.stdout
+        sys.stdout = self.output = StringIO()
+
+        self.write(self.path, get_key(1).to_pem() + get_key(2).to_pem())
+        self.write(self.other, get_key(3).to_pem())
+        self.keyring = Keyring([self.path, self.other])
+
+    def tearDown(self):
+        sys.stdout = self.saved
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def write(self, path, pem):
+        open(path, 'w').write(pem)
+        # Every version gets another mtime, even within one second
+        self.mtime += 10
+        os.utime(path, (self.mtime, self.mtime))
+
+    def ids(self, *secrets):
+        return [get_key_id(get_key(secret)) for secret in secrets]
+
+    def check_usable(self, *secrets):
+        self.assertEqual(self.keyring.get_ids(), self.ids(*secrets))
+        for key_id in self.keyring.get_ids():
+            self.assertEqual(get_key_id(self.keyring.get(key_id)), key_id)
+
+    def test_reload(self):
+        self.check_usable(1, 2, 3)
+        self.write(self.path, get_key(4).to_pem())
+        self.check_usable(4, 3)
+        self.assertRaises(Exception, self.keyring.get, self.ids(1)[0])
+
+    def test_broken_file(self):
+        pem = get_key(4).to_pem()
+        for broken in (pem[:len(pem) / 2], '', 'garbage', pem.replace('M', '*')):
+            self.write(self.path, broken)
+            self.check_usable(1, 2, 3)
+
+        # Reported once per change of the file
+        self.output.truncate(0)
+        self.check_usable(1, 2, 3)
+        self.assertEqual(self.output.getvalue(), '')
+
+        self.write(self.path, pem)
+        self.check_usable(4, 3)
+
+    def test_removed_file(self):
+        os.unlink(self.path)
+        self.check_usable(1, 2, 3)
+
+    def test_shared_key(self):
+        # Key stays while any file has it
+        self.write(self.other, get_key(3).to_pem() + get_key(1).to_pem())
+        self.write(self.path, get_key(2).to_pem())
+        self.check_usable(2, 3, 1)
+
+    def test_verifying_key_printed_once(self):
+        self.assertEqual(self.output.getvalue().count('BEGIN PUBLIC KEY'), 3)
+        self.write(self.path, get_key(1).to_pem() + get_key(5).to_pem())
+        self.keyring.get()
+        self.assertEqual(self.output.getvalue().count('BEGIN PUBLIC KEY'), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import unittest
+from StringIO import StringIO
+
+import ecdsa
+import job
+import buttons
+import sign_plugin
+import signer_pb2 as proto
+from keyring import Keyring
+from layout import Layout
+from machine import StateMachine, LINE_LENGTH, PAGE_LINES
+from proto_cache import ProtoCache
+from display_buffer import DisplayBuffer
+
+CONFIG_PROTO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'protob', 'config.proto')
+
+
+def response(ret):
+    '''Synchronous jobs return list of all their messages, only the last one matters here'''
+    if isinstance(ret, list):
+        return ret[-1]
+    return ret
+
+
+class MachineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='trezor-signer-test-')
+        self.key = ecdsa.SigningKey.from_secret_exponent(0x1234567, curve=ecdsa.SECP256k1)
+        keyfile = os.path.join(self.tmp, 'key.pem')
+        open(keyfile, 'w').write(self.key.to_pem())
+
+        self.saved = (sys.stdout, sign_plugin.proto_cache)
+        sign_plugin.proto_cache = ProtoCache(os.path.join(self.tmp, 'cache'))
+        sys.stdout = StringIO()  # Keyring and machine print a lot
+        self.machine = StateMachine(Keyring([keyfile]), Layout(DisplayBuffer(128, 64)))
+
+    def tearDown(self):
+        # Speculative work of the last request still uses the cache
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread():
+                thread.join()
+        (sys.stdout, sign_plugin.proto_cache) = self.saved
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def send(self, msg):
+        return response(self.machine.process_message(msg))
+
+    def press(self, button):
+        return response(self.machine.press_button(button))
+
+    def assertFailure(self, ret, code):
+        self.assertTrue(isinstance(ret, proto.Failure), ret)
+        self.assertEqual(ret.code, code)
+
+
+class TestSignDigest(MachineTestCase):
+    def sign_firmware(self, firmware):
+        ret = self.send(proto.SignFirmware(slot=1, size=len(firmware)))
+        while isinstance(ret, proto.FirmwareChunkRequest):
+            ret = self.send(proto.FirmwareChunk(data=firmware[ret.offset:ret.offset + ret.length]))
+        return self.press(True).payload
+
+    def sign_digest(self, digest):
+        self.send(proto.SignDigest(digest=digest, description='test'))
+        return self.press(True).payload
+
+    def sign_config(self, config, protospec):
+        self.send(proto.SignPluginConfig(config=config, protospec=protospec))
+        return self.press(True).payload
+
+    def test_firmware(self):
+        firmware = os.urandom(5000)
+        signature = self.sign_firmware(firmware)
+        self.assertTrue(self.key.get_verifying_key().verify(signature, firmware, hashfunc=hashlib.sha256))
+
+        # Host sending SHA-256 of the firmware gets another signature
+        digest = hashlib.sha256(firmware).digest()
+        signature = self.sign_digest(digest)
+        self.assertNotEqual(signature, self.sign_firmware(firmware))
+        self.assertRaises(ecdsa.BadSignatureError, self.key.get_verifying_key().verify, signature, firmware,
+                          hashfunc=hashlib.sha256)
+        self.assertTrue(self.key.get_verifying_key().verify(signature, sign_plugin.get_host_digest_message(digest),
+                                                            hashfunc=hashlib.sha256))
+
+    def test_config(self):
+        config = json.dumps({'valid_days': 1, 'whitelist_urls': ['https://example.com'],
+                             'blacklist_urls': [], 'known_devices': [['0x534c', '0x0001']]})
+        payload = self.sign_config(config, open(CONFIG_PROTO).read()).decode('hex')
+        (signature, data) = (payload[:64], payload[64:])
+        self.assertTrue(self.key.get_verifying_key().verify(signature, data, hashfunc=hashlib.sha256))
+
+        # Signed config can't be made by SignDigest of its hash
+        self.assertNotEqual(self.sign_digest(hashlib.sha256(data).digest()), signature)
+        self.assertFalse(data.startswith(sign_plugin.HOST_DIGEST_PREFIX))
+
+    def test_bad_digest(self):
+        self.assertFailure(self.send(proto.SignDigest(digest='x' * 31)), proto.Failure_SyntaxError)
+
+
+def get_config(urls=1, **changes):
+    config = {'valid_days': 1, 'whitelist_urls': ['https://example%d.com/' % i for i in range(urls)],
+              'blacklist_urls': [], 'known_devices': [['0x534c', '0x0001']]}
+    config.update(changes)
+    return json.dumps(config)
+
+
+class TestConfigPages(MachineTestCase):
+    def setUp(self):
+        MachineTestCase.setUp(self)
+        self.protospec = open(CONFIG_PROTO).read()
+
+    def request(self, config):
+        self.assertEqual(self.send(proto.SignPluginConfig(config=config, protospec=self.protospec)), None)
+        return self.machine.yesno.pages
+
+    def screen(self):
+        return self.machine.layout.buffer.data[:]
+
+    def test_confirm_from_summary(self):
+        # About 20 kB, one press is enough anyway
+        pages = self.request(get_config(urls=800))
+        self.assertTrue(pages.count > 150)
+        self.assertTrue(isinstance(self.press(True), proto.SignedObject))
+
+    def test_cancel_from_summary(self):
+        self.request(get_config(urls=800))
+        self.assertFailure(self.press(False), proto.Failure_ActionCancelled)
+
+    def test_browse(self):
+        pages = self.request(get_config(urls=20))
+        self.assertTrue(pages.count > 2)
+
+        shown = [self.screen()]
+        for page in range(1, pages.count + 1):
+            self.assertEqual(self.press(buttons.HOLD), None)
+            self.assertEqual(self.machine.yesno.page, page % pages.count)
+            shown.append(self.screen())
+
+        # Every page differs, the last one returns to the summary
+        self.assertEqual(len(set(str(s) for s in shown[:-1])), pages.count)
+        self.assertEqual(shown[-1], shown[0])
+
+        # Confirm and cancel work on any page
+        self.press(buttons.HOLD)
+        self.assertTrue(isinstance(self.press(True), proto.SignedObject))
+        self.request(get_config(urls=20))
+        self.press(buttons.HOLD)
+        self.press(buttons.HOLD)
+        self.assertFailure(self.press(False), proto.Failure_ActionCancelled)
+
+    def test_page_content(self):
+        config = get_config(urls=20)
+        pages = self.request(config)
+        text = ''.join(''.join(pages.get(page)) for page in range(1, pages.count))
+        self.assertEqual(text, config)
+        self.assertTrue(all(len(line) <= LINE_LENGTH for line in pages.get(1)))
+        self.assertEqual(len(pages.get(1)), PAGE_LINES)
+
+    def test_hold_is_yes(self):
+        # Nothing to browse in other questions
+        self.send(proto.SignDigest(digest='x' * 32))
+        self.assertTrue(isinstance(self.press(buttons.HOLD), proto.SignedObject))
+
+    def test_bad_config(self):
+        configs = [
+            'not json',
+            '[]',
+            get_config(whitelist_urls=5),
+            get_config(blacklist_urls='https://example.com/'),
+            get_config(whitelist_urls=[5]),
+            get_config(whitelist_urls=[u'https://\u00e9.com/']),
+            get_config(known_devices={'a': 1}),
+            get_config(known_devices=[['0x534c']]),
+            get_config(known_devices=[['0x534c', 'xyz']]),
+            get_config(valid_days='1'),
+            get_config(valid_days=-1),
+            get_config(valid_days=100000),
+            json.dumps({'valid_days': 1}),
+        ]
+        for config in configs:
+            ret = self.send(proto.SignPluginConfig(config=config, protospec=self.protospec))
+            self.assertFailure(ret, proto.Failure_SyntaxError)
+            self.assertNotEqual(ret.message, '')
+
+        ret = self.send(proto.SignPluginConfigBatch(configs=[get_config(), 'not json'], protospec=self.protospec))
+        self.assertFailure(ret, proto.Failure_SyntaxError)
+        self.assertEqual(ret.message, "Config 1: Config is not a valid JSON")
+
+
+class TestPrepare(MachineTestCase):
+    def setUp(self):
+        MachineTestCase.setUp(self)
+        self.protospec = open(CONFIG_PROTO).read()
+        self.prepared = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+        # First config waits for the test, so cancelling comes in the middle
+        self.saved_prepare = sign_plugin.prepare
+        def prepare(config_json, protospec):
+            self.prepared.append(config_json)
+            self.started.set()
+            self.release.wait()
+            return self.saved_prepare(config_json, protospec)
+        sign_plugin.prepare = prepare
+
+    def tearDown(self):
+        self.release.set()
+        MachineTestCase.tearDown(self)
+        sign_plugin.prepare = self.saved_prepare
+
+    def request_batch(self):
+        configs = [get_config(urls=i) for i in range(10)]
+        self.assertEqual(self.send(proto.SignPluginConfigBatch(configs=configs, protospec=self.protospec)), None)
+        self.started.wait()
+        return self.machine.prepared
+
+    def test_cancel(self):
+        prepared = self.request_batch()
+        self.assertFailure(self.press(False), proto.Failure_ActionCancelled)
+        self.release.set()
+        prepared.finished.wait()
+        self.assertEqual(len(self.prepared), 1)
+        self.assertRaises(job.Cancelled, prepared.result)
+
+    def test_next_request(self):
+        # New request replaces the question and its speculative work
+        prepared = self.request_batch()
+        self.send(proto.SignDigest(digest='x' * 32))
+        self.release.set()
+        prepared.finished.wait()
+        self.assertEqual(len(self.prepared), 1)
+
+    def test_confirm(self):
+        self.request_batch()
+        self.release.set()
+        self.assertTrue(isinstance(self.press(True), proto.SignedObject))
+        self.assertEqual(len(self.prepared), 10)
+
+
+class FakeButton(object):
+    def __init__(self):
+        self.state = None
+
+    def read(self):
+        return self.state
+
+
+class TestButtons(unittest.TestCase):
+    def setUp(self):
+        self.saved = buttons.time
+        self.now = 1000.0
+        buttons.time = self
+        self.buttons = buttons.Buttons(stdin=False)
+        self.buttons.hw = FakeButton()
+
+    def tearDown(self):
+        buttons.time = self.saved
+
+    def time(self):
+        return self.now
+
+    def press(self, state, seconds):
+        self.buttons.hw.state = state
+        self.assertEqual(self.buttons.read(), None)
+        self.now += seconds
+        self.buttons.hw.state = None
+        return self.buttons.read()
+
+    def test_press(self):
+        self.assertEqual(self.press(True, 0.2), True)
+        self.assertEqual(self.press(False, 0.2), False)
+        self.assertEqual(self.press(True, buttons.LONG_PRESS), buttons.HOLD)
+        self.assertEqual(self.press(False, buttons.LONG_PRESS), False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import hashlib
+import binascii
+import unittest
+
+import ecdsa
+import merkle
+
+# Trees of all sizes up to this one are checked
+MAX_COUNT = 33
+
+
+def get_items(count):
+    return ['item %d' % i for i in range(count)]
+
+
+class TestProof(unittest.TestCase):
+    def test_round_trip(self):
+        for count in range(1, MAX_COUNT + 1):
+            items = get_items(count)
+            levels = merkle.build_tree(items)
+            root = merkle.get_root(levels)
+            for index in range(count):
+                proof = merkle.get_proof(levels, index)
+                self.assertEqual(len(proof), merkle.get_proof_length(index, count))
+                self.assertEqual(merkle.compute_root(items[index], index, count, proof), root, (index, count))
+
+    def test_single(self):
+        levels = merkle.build_tree(['only'])
+        self.assertEqual(merkle.get_proof(levels, 0), [])
+        self.assertEqual(merkle.compute_root('only', 0, 1, []), merkle.get_root(levels))
+
+    def test_empty(self):
+        self.assertRaises(Exception, merkle.build_tree, [])
+
+    def check_rejected(self, root, data, index, count, proof):
+        try:
+            self.assertNotEqual(merkle.compute_root(data, index, count, proof), root, (index, count))
+        except Exception as exc:
+            self.assertEqual(str(exc), "Invalid Merkle proof")
+
+    def test_tampered_leaf(self):
+        for count in range(1, MAX_COUNT + 1):
+            items = get_items(count)
+            levels = merkle.build_tree(items)
+            for index in range(count):
+                self.check_rejected(merkle.get_root(levels), items[index] + 'x', index, count,
+                                    merkle.get_proof(levels, index))
+
+    def test_tampered_proof(self):
+        for count in range(2, MAX_COUNT + 1):
+            levels = merkle.build_tree(get_items(count))
+            for index in range(count):
+                proof = merkle.get_proof(levels, index)
+                for i in range(len(proof)):
+                    changed = list(proof)
+                    changed[i] = chr(ord(changed[i][0]) ^ 1) + changed[i][1:]
+                    self.check_rejected(merkle.get_root(levels), 'item %d' % index, index, count, changed)
+
+                # Missing or extra element
+                self.check_rejected(merkle.get_root(levels), 'item %d' % index, index, count, proof[:-1])
+                self.check_rejected(merkle.get_root(levels), 'item %d' % index, index, count, proof + [proof[0]])
+
+    def test_wrong_position(self):
+        # Same data and proof are never valid at another index or in a tree of another size
+        for count in range(1, 17):
+            items = get_items(count)
+            levels = merkle.build_tree(items)
+            for index in range(count):
+                proof = merkle.get_proof(levels, index)
+                for other_count in range(1, 2 * count + 2):
+                    for other_index in range(other_count):
+                        if (other_index, other_count) != (index, count):
+                            self.check_rejected(merkle.get_root(levels), items[index], other_index, other_count, proof)
+
+    def test_node_as_leaf(self):
+        # Children of an inner node passed as data of a leaf give another hash
+        for count in range(2, MAX_COUNT + 1):
+            levels = merkle.build_tree(get_items(count))
+            for height in range(1, len(levels)):
+                for index in range(len(levels[height])):
+                    children = levels[height - 1][2 * index:2 * index + 2]
+                    if len(children) < 2:
+                        # Promoted node
+                        continue
+
+                    data = ''.join(children)
+                    self.assertEqual(merkle.node_hash(*children), levels[height][index])
+                    self.assertNotEqual(merkle.leaf_hash(data), levels[height][index])
+
+                    # Proof of the node in the tree cut above its level
+                    proof = merkle.get_proof(levels[height:], index)
+                    self.check_rejected(merkle.get_root(levels), data, index, len(levels[height]), proof)
+
+
+class TestDatafile(unittest.TestCase):
+    def setUp(self):
+        self.key = ecdsa.SigningKey.from_secret_exponent(0x1234567, curve=ecdsa.SECP256k1)
+        self.items = get_items(7)
+        levels = merkle.build_tree(self.items)
+        signature = self.key.sign_deterministic(merkle.get_root(levels), hashfunc=hashlib.sha256)
+        self.datafiles = [merkle.pack_datafile(signature, i, len(self.items), merkle.get_proof(levels, i), self.items[i])
+                          for i in range(len(self.items))]
+
+    def verify(self, datafile):
+        return merkle.verify_datafile(datafile, self.key.get_verifying_key())
+
+    def test_verify(self):
+        for i in range(len(self.items)):
+            self.assertEqual(self.verify(self.datafiles[i]), self.items[i])
+
+    def test_tampered(self):
+        raw = binascii.unhexlify(self.datafiles[3])
+        header = 64 + merkle.HEADER.size
+        changes = [
+            raw[:-1] + 'x',  # Data
+            raw[:header] + chr(ord(raw[header]) ^ 1) + raw[header + 1:],  # Proof
+            raw[:64] + merkle.HEADER.pack(2, 7) + raw[header:],  # Index
+            raw[:64] + merkle.HEADER.pack(3, 8) + raw[header:],  # Count
+            raw[:64] + merkle.HEADER.pack(3, 6) + raw[header:],
+            chr(ord(raw[0]) ^ 1) + raw[1:],  # Signature
+            raw[:header],
+        ]
+        for raw in changes:
+            self.assertRaises(Exception, self.verify, binascii.hexlify(raw))
+
+    def test_other_key(self):
+        other = ecdsa.SigningKey.from_secret_exponent(0x7654321, curve=ecdsa.SECP256k1)
+        self.assertRaises(ecdsa.BadSignatureError, merkle.verify_datafile, self.datafiles[0], other.get_verifying_key())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import sign_plugin
+from proto_cache import ProtoCache, get_key
+
+SPEC = '''syntax = "proto2";
+
+message Initialize {
+    optional string language = 1 [default='english'];
+}
+'''
+
+
+class TestDamagedEntries(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='trezor-signer-test-')
+        self.saved = sign_plugin.proto_cache
+        sign_plugin.proto_cache = ProtoCache(self.tmp)
+
+        self.key = get_key(SPEC, sign_plugin.PROTOBUF_PROTO_DIR)
+        self.path = os.path.join(self.tmp, self.key)
+        self.expected = sign_plugin.get_compiled_proto(SPEC)
+
+    def tearDown(self):
+        sign_plugin.proto_cache = self.saved
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def damage(self, func):
+        '''Change the entry on the disk and start with a fresh process (empty memory)'''
+        entry = open(self.path, 'rb').read()
+        open(self.path, 'wb').write(func(entry))
+        sign_plugin.proto_cache = ProtoCache(self.tmp)
+
+    def check_recompiled(self):
+        self.assertEqual(sign_plugin.get_compiled_proto(SPEC), self.expected)
+        self.assertEqual(sign_plugin.proto_cache.get(self.key), self.expected.SerializeToString())
+
+    def test_entry(self):
+        cache = ProtoCache(self.tmp)
+        self.assertEqual(cache.get(self.key), self.expected.SerializeToString())
+        self.assertEqual([name for name in os.listdir(self.tmp) if name.startswith('.')], [])
+
+    def test_empty(self):
+        self.damage(lambda entry: '')
+        self.assertEqual(ProtoCache(self.tmp).get(self.key), None)
+        self.assertFalse(os.path.exists(self.path))
+        self.check_recompiled()
+
+    def test_truncated(self):
+        for size in (0, 16, 32, 40):
+            self.damage(lambda entry: entry[:size])
+            self.check_recompiled()
+
+    def test_changed(self):
+        self.damage(lambda entry: entry[:-1] + chr(ord(entry[-1]) ^ 1))
+        self.check_recompiled()
+
+    def test_unparsable(self):
+        # Passes the checksum but it isn't FileDescriptorSet, or an empty one
+        for data in ('\xff\xff\xff', ''):
+            sign_plugin.proto_cache.put(self.key, data)
+            self.check_recompiled()
+
+
+if __name__ == '__main__':
+    unittest.main()
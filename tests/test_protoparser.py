@@ -0,0 +1,169 @@
+import os
+import shutil
+import tempfile
+import unittest
+import subprocess
+from distutils.spawn import find_executable
+
+import protoparser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Specs with descriptors compiled by protoc (see build.sh there)
+DATA = os.path.join(ROOT, 'tests', 'data', 'protoparser')
+
+# Directory with .proto files -> directory with their descriptors
+SPECS = [
+    (os.path.join(ROOT, 'protob'), os.path.join(DATA, 'protob')),
+    (os.path.join(DATA, 'trezor-r0.10.0'), os.path.join(DATA, 'trezor-r0.10.0')),
+    (os.path.join(DATA, 'trezor-r0.10.2'), os.path.join(DATA, 'trezor-r0.10.2')),
+    (os.path.join(DATA, 'misc'), os.path.join(DATA, 'misc')),
+]
+
+# Specs protoc compiles, checked with protoc when it's installed
+ACCEPTED = {
+    'alias': 'enum E { option allow_alias = true; X = 0; Y = 0; }',
+    'descriptor_extension': 'import "google/protobuf/descriptor.proto";\n'
+                            'extend google.protobuf.FieldOptions { optional bool binary = 50001; }\n'
+                            'message M { optional bytes a = 1 [(binary) = true]; }',
+    'hex_default': 'message M { optional int32 a = 1 [default = 0x10]; optional sint64 b = 2 [default = -9223372036854775808]; }',
+    'negative_zero': 'message M { optional int32 a = 1 [default = -0]; }',
+    'packed': 'message M { repeated int32 a = 1 [packed=true]; }',
+    'standard_option': 'message M { optional int32 a = 1 [ctype = CORD]; }',
+    'float_default': 'message M { optional float a = 1 [default = 1e10]; optional double b = 2 [default = 1e10]; }',
+}
+
+# Specs protoc refuses
+REJECTED = {
+    'duplicate_number': 'message M { optional int32 a = 1; optional int32 b = 1; }',
+    'zero_number': 'message M { optional int32 a = 0; }',
+    'big_number': 'message M { optional int32 a = 536870912; }',
+    'library_number': 'message M { optional int32 a = 19001; }',
+    'reserved_number': 'message M { reserved 5 to 7; optional int32 a = 6; }',
+    'reserved_name': 'message M { reserved "a"; optional int32 a = 6; }',
+    'extension_range': 'message M { extensions 100 to 199; }\nextend M { optional int32 e = 300; }',
+    'duplicate_extension': 'message M { extensions 100 to 199; }\nextend M { optional int32 e = 150; optional int32 f = 150; }',
+    'extension_over_field': 'message M { extensions 1 to 10; optional int32 a = 5; }',
+    'descriptor_extension_range': 'import "google/protobuf/descriptor.proto";\n'
+                                  'extend google.protobuf.FieldOptions { optional bool binary = 5; }',
+    'enum_default': 'enum E { X = 0; } message M { optional E a = 1 [default = Y]; }',
+    'empty_enum': 'enum E { }',
+    'enum_alias': 'enum E { X = 0; Y = 0; }',
+    'packed_single': 'message M { optional int32 a = 1 [packed=true]; }',
+    'packed_string': 'message M { repeated string a = 1 [packed=true]; }',
+    'int_default': 'message M { optional int32 a = 1 [default = 3000000000]; }',
+    'unsigned_negative': 'message M { optional uint32 a = 1 [default = -1]; }',
+    'message_default': 'message N {} message M { optional N a = 1 [default = 1]; }',
+    'bad_x_escape': 'message M { optional string a = 1 [default = "\\xZZ"]; }',
+    'bad_u_escape': 'message M { optional string a = 1 [default = "\\uZZZZ"]; }',
+    'option_range': 'import "google/protobuf/descriptor.proto";\n'
+                    'extend google.protobuf.FieldOptions { optional fixed32 w = 50001; }\n'
+                    'message M { optional int32 a = 1 [(w) = 5000000000]; }',
+    'option_negative': 'import "google/protobuf/descriptor.proto";\n'
+                       'extend google.protobuf.FieldOptions { optional uint64 w = 50001; }\n'
+                       'message M { optional int32 a = 1 [(w) = -1]; }',
+    'unknown_option': 'message M { option (x) = 1; }',
+}
+
+
+def get_source(text):
+    return 'syntax = "proto2";\n' + text + '\n'
+
+
+class Protoc(object):
+    '''Runs protoc in its own temporary directory'''
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix='trezor-signer-test-')
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def compile(self, source, name='test.proto'):
+        '''Serialized FileDescriptorSet or None if protoc refuses the spec'''
+        open(os.path.join(self.directory, name), 'w').write(source)
+        out = os.path.join(self.directory, 'out.bin')
+        with open(os.devnull, 'w') as null:
+            if subprocess.call(['protoc', '-I/usr/include', '-I' + self.directory, name, '-o' + out],
+                               cwd=self.directory, stderr=null):
+                return None
+        return open(out, 'rb').read()
+
+
+class TestProtocOutput(unittest.TestCase):
+    def compile(self, directory, name):
+        # Specs import each other from the same directory
+        imports = dict((other, open(os.path.join(directory, other)).read())
+                       for other in os.listdir(directory) if other.endswith('.proto') and other != name)
+        return protoparser.compile_proto(open(os.path.join(directory, name)).read(), name, imports)
+
+    def test_specs(self):
+        count = 0
+        for (directory, compiled) in SPECS:
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith('.proto'):
+                    continue
+
+                expected = open(os.path.join(compiled, name[:-len('.proto')] + '.bin'), 'rb').read()
+                self.assertEqual(self.compile(directory, name), expected, os.path.join(directory, name))
+                count += 1
+
+        self.assertEqual(count, 13)
+
+    def test_accepted(self):
+        protoc = Protoc() if find_executable('protoc') else None
+        try:
+            for (name, text) in sorted(ACCEPTED.items()):
+                compiled = protoparser.compile_proto(get_source(text), 'test.proto')
+                if protoc:
+                    self.assertEqual(compiled, protoc.compile(get_source(text)), name)
+        finally:
+            if protoc:
+                protoc.close()
+
+    def test_float_default(self):
+        # Floats are formatted by SimpleFtoa, doubles by SimpleDtoa
+        compiled = protoparser.Compiler().compile(get_source(ACCEPTED['float_default']), 'test.proto')
+        fields = compiled.file[0].message_type[0].field
+        self.assertEqual([f.default_value for f in fields], ['1e+10', '10000000000'])
+
+
+class TestRejected(unittest.TestCase):
+    def test_rejected(self):
+        for (name, text) in sorted(REJECTED.items()):
+            self.assertRaises(protoparser.ParseError, protoparser.compile_proto, get_source(text), 'test.proto')
+
+    def test_protoc(self):
+        # Installed protoc refuses them too
+        if not find_executable('protoc'):
+            self.skipTest("protoc is not installed")
+
+        protoc = Protoc()
+        try:
+            for (name, text) in sorted(REJECTED.items()):
+                self.assertEqual(protoc.compile(get_source(text)), None, name)
+        finally:
+            protoc.close()
+
+
+class TestInstalledProtoc(unittest.TestCase):
+    def test_specs(self):
+        # Checked-in descriptors are what the installed protoc produces
+        if not find_executable('protoc'):
+            self.skipTest("protoc is not installed")
+
+        for (directory, compiled) in SPECS:
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith('.proto'):
+                    continue
+
+                out = tempfile.NamedTemporaryFile(suffix='.bin')
+                with open(os.devnull, 'w') as null:
+                    subprocess.check_call(['protoc', '-I/usr/include', '-I' + directory, name, '-o' + out.name],
+                                          cwd=directory, stderr=null)
+                expected = open(os.path.join(compiled, name[:-len('.proto')] + '.bin'), 'rb').read()
+                self.assertEqual(open(out.name, 'rb').read(), expected, os.path.join(directory, name))
+                out.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import random
+import hashlib
+import unittest
+
+import ecdsa
+import sign_backend
+
+CURVES = (ecdsa.SECP256k1, ecdsa.NIST224p, ecdsa.NIST256p, ecdsa.NIST384p, ecdsa.NIST521p)
+
+# Random keys and messages per curve
+SAMPLES = 50
+
+
+def samples(rand, curve):
+    for i in range(SAMPLES):
+        key = ecdsa.SigningKey.from_secret_exponent(rand.randint(1, curve.order - 1), curve=curve)
+        data = ''.join(chr(rand.randint(0, 255)) for _ in range(i * 7))
+        yield (key, data)
+
+
+class TestEcdsaBackend(unittest.TestCase):
+    def test_reference(self):
+        # Reference is python-ecdsa's own RFC 6979 signing
+        backend = sign_backend.EcdsaBackend()
+        for (key, data) in samples(random.Random(6), ecdsa.SECP256k1):
+            self.assertEqual(backend.sign(key, data), key.sign_deterministic(data, hashfunc=hashlib.sha256))
+
+
+class TestBackendConformance(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.backend = sign_backend.OpensslBackend()
+        except ImportError:
+            self.skipTest("cryptography is not installed")
+        self.reference = sign_backend.EcdsaBackend()
+        self.rand = random.Random(6)
+
+    def test_sign(self):
+        for curve in CURVES:
+            for (key, data) in samples(self.rand, curve):
+                signature = self.backend.sign(key, data)
+                self.assertEqual(signature, self.reference.sign(key, data), curve.name)
+                self.assertTrue(key.get_verifying_key().verify(signature, data, hashfunc=hashlib.sha256))
+
+    def test_sign_digest(self):
+        for curve in CURVES:
+            for (key, data) in samples(self.rand, curve):
+                digest = hashlib.sha256(data).digest()
+                self.assertEqual(self.backend.sign_digest(key, digest), self.reference.sign(key, data), curve.name)
+
+    def test_get_backend(self):
+        self.assertEqual(sign_backend.get_backend('auto').name, 'openssl')
+        self.assertEqual(sign_backend.get_backend('ecdsa').name, 'ecdsa')
+        self.assertRaises(Exception, sign_backend.get_backend, 'unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
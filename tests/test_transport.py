@@ -0,0 +1,88 @@
+import random
+import unittest
+
+import struct
+
+import signer_pb2 as proto
+from transport import FrameDecoder, FrameEncoder, FrameTooLong, MAX_LENGTHS, FIRMWARE_CHUNK_SIZE
+
+
+def get_frame(msg_type, payload):
+    return FrameEncoder().encode(msg_type, payload).tobytes()
+
+
+class TestFrameDecoder(unittest.TestCase):
+    def receive(self, decoder, stream, rand):
+        '''Feed stream in random pieces through reserve/commit, return all frames'''
+        frames = []
+        pos = 0
+        while pos < len(stream):
+            length = min(rand.randint(1, 100), len(stream) - pos)
+            decoder.reserve(length)[:] = stream[pos:pos + length]
+            decoder.commit(length)
+            pos += length
+
+            frame = decoder.pop()
+            while frame is not None:
+                frames.append(frame)
+                frame = decoder.pop()
+        return frames
+
+    def test_random_split(self):
+        rand = random.Random(2)
+        expected = [(rand.randint(0, 60), ''.join(chr(rand.randint(0, 255)) for _ in range(rand.randint(0, 3000))))
+                    for _ in range(100)]
+        # Padding between frames is skipped
+        stream = ''.join(get_frame(t, p) + '\x00' * rand.randint(0, 62) for (t, p) in expected)
+
+        # Small buffer is compacted and grown many times
+        for size in (16, 64, 4096):
+            self.assertEqual(self.receive(FrameDecoder(size), stream, rand), expected)
+
+    def test_compaction_overlap(self):
+        # Moved data overlap their new place, they must arrive intact
+        decoder = FrameDecoder(64)
+        frame = get_frame(7, ''.join(chr(i) for i in range(40)))
+        decoder.feed('\x00' * 20 + frame[:30])
+        self.assertEqual(decoder.pop(), None)
+        self.assertEqual(decoder.start, 28)
+        decoder.feed(frame[30:])
+        self.assertEqual(decoder.pop(), (7, frame[8:]))
+
+    def test_feed(self):
+        decoder = FrameDecoder(16)
+        decoder.feed(get_frame(1, 'abc') + get_frame(2, 'x' * 100))
+        self.assertEqual(decoder.pop(), (1, 'abc'))
+        self.assertEqual(decoder.pop(), (2, 'x' * 100))
+        self.assertEqual(decoder.pop(), None)
+
+    def test_frame_too_long(self):
+        chunk = proto.FirmwareChunk(data='x' * FIRMWARE_CHUNK_SIZE).SerializeToString()
+        decoder = FrameDecoder(64, max_lengths=MAX_LENGTHS, max_length=100000)
+        decoder.feed(get_frame(proto.MessageType_FirmwareChunk, chunk))
+        self.assertEqual(decoder.pop(), (proto.MessageType_FirmwareChunk, chunk))
+
+        # Only the header is needed to reject the frame
+        length = FIRMWARE_CHUNK_SIZE * 1000
+        decoder.feed('##' + struct.pack('>HL', proto.MessageType_FirmwareChunk, length))
+        self.assertRaises(FrameTooLong, decoder.pop)
+
+        # Payload is dropped as it arrives, the buffer doesn't grow
+        for _ in range(1000):
+            decoder.feed('x' * FIRMWARE_CHUNK_SIZE)
+            self.assertEqual(decoder.pop(), None)
+        self.assertTrue(len(decoder.buffer) <= 2 * FIRMWARE_CHUNK_SIZE)
+
+        # Next frame is decoded normally
+        decoder.feed(get_frame(1, 'abc'))
+        self.assertEqual(decoder.pop(), (1, 'abc'))
+
+        # Other types are limited by max_length
+        decoder.feed(get_frame(2, 'y' * 100000) + get_frame(3, 'z' * 100001) + get_frame(4, ''))
+        self.assertEqual(decoder.pop(), (2, 'y' * 100000))
+        self.assertRaises(FrameTooLong, decoder.pop)
+        self.assertEqual(decoder.pop(), (4, ''))
+
+
+if __name__ == '__main__':
+    unittest.main()